@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+os.environ['RW_HEADLESS'] = '1'  # SDL dummy video/audio drivers, see main.HEADLESS
+import pygame
+import main
+
+
+SCENARIOS = [
+    {'name': 'idle', 'torpedoes': 0, 'drones': 0, 'enemy_fighters': 0, 'black_holes': 2},
+    {'name': 'torpedoes-100', 'torpedoes': 100, 'drones': 50, 'enemy_fighters': 10, 'black_holes': 2},
+    {'name': 'torpedoes-1000', 'torpedoes': 1000, 'drones': 50, 'enemy_fighters': 10, 'black_holes': 2},
+    # over the 60 fps budget: the ~10k RLE alpha blits alone cost ~15 ms here, and pygame 2.6 has no fblits
+    {'name': 'torpedoes-10000', 'torpedoes': 10000, 'drones': 50, 'enemy_fighters': 10, 'black_holes': 2},
+    {'name': 'black-holes-10', 'torpedoes': 1000, 'drones': 50, 'enemy_fighters': 10, 'black_holes': 10},
+    {'name': 'black-holes-50', 'torpedoes': 1000, 'drones': 50, 'enemy_fighters': 10, 'black_holes': 50},
+]
+PERCENTILES = (50, 95, 99)
+GRAVITY_HOLE_COUNTS = (2, 10, 50, 200, 1000)
+GRAVITY_GRID_SPACINGS = (8, 16, 32)
+
+
+def build_game(scenario, seed):
+    random.seed(seed)
+    game = main.RelativityWars()
+    game.clock.set_mode(main.GameClock.STEPPED)
+    game.sound_effects = False
+    game.game_params.black_holes = scenario['black_holes']
+    game.game_active = True
+    game.next_level_transition = False
+    game.setup_game()
+    game.scheduler.cancel_all()  # populations are held fixed by populate() instead
+    game.lives = sys.maxsize
+    return game
+
+
+def populate(game, scenario, rng):
+    # top the groups back up to the scenario population; not part of the timed phases
+    screen_shape = np.array(game.screen_shape)
+    for group, count in ((game.torpedo_group, scenario['torpedoes'] // 2),
+                         (game.enemy_torpedo_group, scenario['torpedoes'] - scenario['torpedoes'] // 2)):
+        missing = count - len(group)
+        if missing > 0:
+            group.fire(rng.random((missing, 2)) * screen_shape, rng.random(missing) * 2 * np.pi, speed=10)
+    while len(game.drone_group) < scenario['drones']:
+        game.spawn_drone()
+    while len(game.enemy_fighter_group) < scenario['enemy_fighters']:
+        game.spawn_enemy_fighter()
+
+
+def summarize(samples):
+    samples = np.array(samples) * 1000
+    summary = {f'p{p}': float(np.percentile(samples, p)) for p in PERCENTILES}
+    summary.update({'mean': float(samples.mean()), 'max': float(samples.max())})
+    return summary
+
+
+def run_scenario(scenario, frames, warmup, seed):
+    game = build_game(scenario, seed)
+    rng = np.random.default_rng(seed)
+    update_times, draw_times = [], []
+    for frame in range(warmup + frames):
+        populate(game, scenario, rng)
+        game.clock.tick()
+        start = time.perf_counter()
+        game.update_game([])
+        middle = time.perf_counter()
+        game.draw_game()
+        end = time.perf_counter()
+        if frame >= warmup:
+            update_times.append(middle - start)
+            draw_times.append(end - middle)
+    return {'scenario': scenario,
+            'frames': frames,
+            'update_ms': summarize(update_times),
+            'draw_ms': summarize(draw_times),
+            'frame_ms': summarize(np.add(update_times, draw_times))}
+
+
+def run_gravity(hole_counts, entities, repeats, cutoff, theta, grid_spacings, seed):
+    # GravityEngine cost per mode against black hole count for a fixed entity count, and each approximation's
+    # clamped error against the exact field (what RWSprite.calculate_gravity returns), next to the bound it reports
+    # if it has one (per component, so times sqrt(2) as a norm). GRID is timed as a lookup plus, separately, a full
+    # build and the update following one frame of black hole movement.
+    # CUTOFF is skipped where GravityEngine refuses it, its worst case error reaching MAX_GRAVITY
+    rng = np.random.default_rng(seed)
+    screen_shape = np.array(main.screen_shape)
+    engine = main.GravityEngine
+    tolerance = main.GameParams.gravity_grid_tolerance
+    step = np.array([main.BlackHole.speed, 0])
+    modes = [(engine.EXACT, {}, None, lambda positions, black_holes, _: (engine.field(positions, black_holes), None)),
+             (engine.CUTOFF, {'cutoff': cutoff}, None, lambda positions, black_holes, _: engine.cutoff_field(positions, black_holes, cutoff)),
+             (engine.BARNES_HUT, {'theta': theta}, None,
+              lambda positions, black_holes, _: main.BarnesHutTree(black_holes).field(positions, theta))]
+    for spacing in grid_spacings:
+        modes.append((engine.GRID, {'spacing': spacing},
+                      lambda black_holes, spacing=spacing: main.GravityGrid(black_holes, screen_shape, spacing, tolerance),
+                      lambda positions, black_holes, grid: (grid.lookup(positions), None)))
+    results = []
+    for holes in hole_counts:
+        black_holes = rng.random((holes, 2)) * screen_shape
+        positions = rng.random((entities, 2)) * screen_shape
+        exact = engine.field(positions, black_holes)
+        for mode, settings, prepare, calculate in modes:
+            result = {'mode': mode, 'black_holes': holes, 'entities': entities, **settings}
+            if mode == engine.CUTOFF and engine.cutoff_error(holes, cutoff) > engine.MAX_GRAVITY:
+                results.append({**result, 'refused': True})
+                continue
+            prepared = None
+            if prepare:
+                times, update_times = [], []
+                for _ in range(max(1, repeats // 10)):  # building is far slower than a lookup
+                    start = time.perf_counter()
+                    prepared = prepare(black_holes)
+                    times.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    prepared.update(black_holes + step)
+                    update_times.append(time.perf_counter() - start)
+                result['prepare_ms'] = summarize(times)
+                result['update_ms'] = summarize(update_times)
+                prepared = prepare(black_holes)
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                vector, bound = calculate(positions, black_holes, prepared)
+                times.append(time.perf_counter() - start)
+            result['ms'] = summarize(times)
+            if mode != engine.EXACT:
+                error = np.hypot(*(engine.clamped(vector) - exact).T)
+                result.update({'max_error': float(error.max()), 'p95_error': float(np.percentile(error, 95)),
+                               'mean_error': float(error.mean())})
+            if bound is not None:
+                bound = bound * np.sqrt(2)
+                result.update({'max_bound': float(bound.max()), 'bound_holds': bool((error <= bound + 1e-9).all())})
+            results.append(result)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r') as f:
+        baseline = {r['scenario']['name']: r for r in json.loads(f.read())['results']}
+    for result in results:
+        name = result['scenario']['name']
+        if name not in baseline:
+            continue
+        for phase in ('update_ms', 'draw_ms', 'frame_ms'):
+            for stat in ('p50', 'p95', 'p99'):
+                old, new = baseline[name][phase][stat], result[phase][stat]
+                change = (new - old) / old * 100 if old else 0
+                print(f'{name:>18} {phase:>9} {stat}: {old:8.3f} -> {new:8.3f} ms ({change:+.1f}%)')
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Time game_loop update and draw phases under fixed populations')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenario', action='append', help='only run scenarios with this name (repeatable)')
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--compare', help='earlier output file to compare percentiles against')
+    parser.add_argument('--budget-ms', type=float, default=1000 / main.RelativityWars.fps, help='frame time budget for the p95')
+    parser.add_argument('--gravity', action='store_true', help='time the gravity modes against black hole count instead')
+    parser.add_argument('--gravity-holes', type=int, action='append', help='black hole counts for --gravity (repeatable)')
+    parser.add_argument('--gravity-entities', type=int, default=1000)
+    parser.add_argument('--gravity-cutoff', type=float, default=main.GameParams.gravity_cutoff)
+    parser.add_argument('--gravity-theta', type=float, default=main.GameParams.gravity_theta)
+    parser.add_argument('--gravity-grid-spacing', type=int, action='append', help='GRID sample spacings in px (repeatable)')
+    args = parser.parse_args()
+
+    if args.gravity:
+        results = run_gravity(args.gravity_holes or GRAVITY_HOLE_COUNTS, args.gravity_entities, args.frames // 10 or 1,
+                              args.gravity_cutoff, args.gravity_theta, args.gravity_grid_spacing or GRAVITY_GRID_SPACINGS, args.seed)
+        for result in results:
+            if result.get('refused'):
+                print(f"{result['mode']:>14} {result['black_holes']:5d} holes  refused: error could reach MAX_GRAVITY")
+                continue
+            mode = f"{result['mode']} {result['spacing']}px" if 'spacing' in result else result['mode']
+            prepare = (f"  build p50 {result['prepare_ms']['p50']:8.3f} ms  update p50 {result['update_ms']['p50']:7.3f} ms"
+                       if 'prepare_ms' in result else '')
+            error = f"  error max {result['max_error']:7.3f} p95 {result['p95_error']:7.3f}" if 'max_error' in result else ''
+            bound = f"  bound {result['max_bound']:8.3f}" if 'max_bound' in result else ''
+            print(f"{mode:>14} {result['black_holes']:5d} holes  p50 {result['ms']['p50']:8.3f} ms{prepare}{error}{bound}")
+        with open(args.output, 'w') as f:
+            f.write(json.dumps({'revision': git_revision(), 'numpy': np.__version__, 'screen_shape': list(main.screen_shape),
+                                'seed': args.seed, 'gravity': results}, indent=2))
+        return
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s['name'] in args.scenario]
+    results = []
+    for scenario in scenarios:
+        result = run_scenario(scenario, args.frames, args.warmup, args.seed)
+        results.append(result)
+        verdict = 'within' if result['frame_ms']['p95'] <= args.budget_ms else 'over'
+        print(f"{scenario['name']:>18}  update p50 {result['update_ms']['p50']:7.3f} ms  "
+              f"draw p50 {result['draw_ms']['p50']:7.3f} ms  frame p99 {result['frame_ms']['p99']:7.3f} ms  "
+              f"p95 {verdict} the {args.budget_ms:.1f} ms budget")
+
+    report = {'revision': git_revision(),
+              'python': platform.python_version(),
+              'pygame': pygame.version.ver,
+              'numpy': np.__version__,
+              'screen_shape': list(main.screen_shape),
+              'seed': args.seed,
+              'budget_ms': args.budget_ms,
+              'results': results}
+    with open(args.output, 'w') as f:
+        f.write(json.dumps(report, indent=2))
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main_cli()
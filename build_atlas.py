@@ -0,0 +1,63 @@
+import os
+import json
+import glob
+import argparse
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'  # no window needed, only image load/save
+import pygame
+
+
+ASSETS_DIR = 'assets'
+ATLAS_IMAGE = 'atlas.png'
+ATLAS_INDEX = 'atlas.json'
+
+
+def load_sprites(directory):
+    sprites = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.png'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name != os.path.splitext(ATLAS_IMAGE)[0]:
+            sprites[name] = pygame.image.load(path)
+    return sprites
+
+
+def pack(sizes, max_width, padding):
+    # shelf packing: tallest first, left to right, new shelf when the row is full
+    regions, x, y, shelf_height, width = {}, 0, 0, 0, 0
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0], item[0])):
+        if x and x + w > max_width:
+            x, y, shelf_height = 0, y + shelf_height + padding, 0
+        regions[name] = [x, y, w, h]
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+        width = max(width, x - padding)
+    return regions, (width, y + shelf_height)
+
+
+def build(directory=ASSETS_DIR, max_width=2048, padding=1):
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    sprites = load_sprites(directory)
+    regions, size = pack({name: sprite.get_size() for name, sprite in sprites.items()}, max_width, padding)
+    sheet = pygame.Surface(size, pygame.SRCALPHA)
+    for name, sprite in sprites.items():
+        sheet.blit(sprite, regions[name][:2])
+    pygame.image.save(sheet, os.path.join(directory, ATLAS_IMAGE))
+    with open(os.path.join(directory, ATLAS_INDEX), 'w') as f:
+        f.write(json.dumps({'image': ATLAS_IMAGE, 'sprites': regions}, indent=2, sort_keys=True))
+    return regions, size
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Pack assets/*.png into one atlas image plus a JSON index of regions')
+    parser.add_argument('--assets', default=ASSETS_DIR)
+    parser.add_argument('--max-width', type=int, default=2048)
+    parser.add_argument('--padding', type=int, default=1)
+    args = parser.parse_args()
+
+    regions, size = build(args.assets, args.max_width, args.padding)
+    print(f'packed {len(regions)} sprites into {size[0]}x{size[1]} {os.path.join(args.assets, ATLAS_IMAGE)}')
+
+
+if __name__ == '__main__':
+    main_cli()
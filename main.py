@@ -1,30 +1,456 @@
 import pygame
 import sys
+import os
 import math
 import numpy as np
 import random
 import time
 import json
+import argparse
+import heapq
+import itertools
+import csv
+import threading
+import zlib
+from collections import OrderedDict
 from screeninfo import get_monitors
 
 
+# headless: no window, no audio device, no monitor query (set RW_HEADLESS=1 before importing)
+HEADLESS = any(arg in ('--headless', '--replay') or arg.startswith('--replay=') for arg in sys.argv) or os.environ.get('RW_HEADLESS') == '1'
+HEADLESS_SCREEN_SHAPE = (1920, 1080)
+if HEADLESS:
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
 pygame.mixer.init()
 pygame.init()
 
-monitor = get_monitors()[0]
-screen_shape = (monitor.width, monitor.height)
-screen = pygame.display.set_mode(screen_shape, pygame.FULLSCREEN)
+if HEADLESS:
+    screen_shape = HEADLESS_SCREEN_SHAPE
+    screen = pygame.display.set_mode(screen_shape)
+else:
+    monitor = get_monitors()[0]
+    screen_shape = (monitor.width, monitor.height)
+    screen = pygame.display.set_mode(screen_shape, pygame.FULLSCREEN)
+
+
+def fade_variants(image, levels):
+    # copies of image with a surface alpha on top of its per-pixel alpha, one per opacity level
+    variants = {}
+    for alpha in levels:
+        variant = image.copy()
+        variant.set_alpha(alpha)
+        variants[alpha] = variant
+    return variants
+
+
+class TextureAtlas:
+    # sprites packed by build_atlas.py into one sheet, converted to the display format once and handed out as subsurfaces
+    def __init__(self, index_path):
+        self.directory = os.path.dirname(index_path)
+        with open(index_path, 'r') as f:
+            index = json.loads(f.read())
+        self.sheet = pygame.image.load(os.path.join(self.directory, index['image'])).convert_alpha()
+        self.regions = index['sprites']
+        self.images = {}
+
+    def image(self, name, alpha=True):
+        key = (name, alpha)
+        if key not in self.images:
+            if name in self.regions:
+                surface = self.sheet.subsurface(self.regions[name])
+            else:  # added to assets/ since build_atlas.py last ran
+                surface = pygame.image.load(os.path.join(self.directory, f'{name}.png')).convert_alpha()
+            self.images[key] = surface if alpha else surface.convert()
+        return self.images[key]
+
+
+atlas = TextureAtlas('assets/atlas.json')
+
+
+class AssetManager:
+    # sounds and fonts decoded on first use, or ahead of it by a background thread
+    def __init__(self, directory):
+        self.directory = directory
+        self.sounds = {}
+        self.fonts = {}
+        self.lock = threading.Lock()
+        self.loader = None
+
+    def sound(self, name):
+        sound = self.sounds.get(name)
+        if sound is None:
+            with self.lock:  # the loader thread may be decoding it right now
+                sound = self.sounds.get(name)
+                if sound is None:
+                    sound = self.sounds[name] = pygame.mixer.Sound(os.path.join(self.directory, name))
+        return sound
+
+    def font(self, name, size):
+        key = (name, size)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.Font(os.path.join(self.directory, name), size)
+        return self.fonts[key]
+
+    def preload_sounds(self, names):
+        if self.loader is None:
+            self.loader = threading.Thread(target=lambda: [self.sound(name) for name in names], daemon=True)
+            self.loader.start()
+        return self.loader
+
+
+assets = AssetManager('assets')
+
+
+class LazySound:
+    # class-level sound attribute, decoded through assets on first access
+    names = []
+
+    def __init__(self, name):
+        self.name = name
+        if name not in self.names:
+            self.names.append(name)
+
+    def __get__(self, instance, owner):
+        return assets.sound(self.name)
+
+
+class LazyFont:
+    # class-level font attribute, opened through assets on first access
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def __get__(self, instance, owner):
+        return assets.font(self.name, self.size)
+
+
+class AudioManager:
+    # sound effects queued during the frame and started once per frame on reserved channel groups
+    groups = {'weapons': {'channels': 8, 'voices': 3},  # voices: max concurrent plays of any one sound
+              'deaths': {'channels': 6, 'voices': 3},
+              'powerups': {'channels': 2, 'voices': 1},
+              'ui': {'channels': 2, 'voices': 1}}
+
+    def __init__(self, game):
+        self.game = game
+        self.queue = {}  # (sound, category) -> None, insertion ordered
+        self.played = 0
+        self.dropped = 0
+        self.coalesced = 0
+        reserved = sum(group['channels'] for group in self.groups.values())
+        pygame.mixer.set_num_channels(max(reserved, pygame.mixer.get_num_channels()))
+        pygame.mixer.set_reserved(reserved)
+        self.channels = {}
+        first = 0
+        for category, group in self.groups.items():
+            self.channels[category] = [pygame.mixer.Channel(i) for i in range(first, first + group['channels'])]
+            first += group['channels']
+
+    def play(self, sound, category):
+        if not self.game.sound_effects:
+            return
+        if (sound, category) in self.queue:
+            self.coalesced += 1
+        else:
+            self.queue[(sound, category)] = None
+
+    def flush(self):
+        for sound, category in self.queue:
+            channels = self.channels[category]
+            voices = sum(1 for channel in channels if channel.get_busy() and channel.get_sound() is sound)
+            channel = next((channel for channel in channels if not channel.get_busy()), None)
+            if voices >= self.groups[category]['voices'] or channel is None:
+                self.dropped += 1
+            else:
+                channel.play(sound)
+                self.played += 1
+        self.queue.clear()
+
+    def reset_counters(self):
+        self.played = self.dropped = self.coalesced = 0
+
+
+class GameClock:
+    # simulation time in seconds, advanced once per tick and read everywhere through .now
+    REALTIME = 'realtime'  # follows the wall clock
+    ACCELERATED = 'accelerated'  # follows the wall clock times speed
+    STEPPED = 'stepped'  # advances tick_length per tick, whatever the wall clock says
+    modes = (REALTIME, ACCELERATED, STEPPED)
+
+    def __init__(self, mode=REALTIME, tick_length=1 / 60, speed=1.):
+        self.now = 0.
+        self.ticks = 0
+        self.paused = False
+        self.tick_length = tick_length
+        self.set_mode(mode, speed)
+
+    def set_mode(self, mode, speed=None):
+        if mode not in self.modes:
+            raise ValueError(f'unknown clock mode {mode!r}')
+        self.mode = mode
+        if speed is not None:
+            self.speed = speed
+        self.last_wall_time = time.perf_counter()
+
+    def tick(self):
+        wall_time = time.perf_counter()
+        if not self.paused:
+            if self.mode == self.STEPPED:
+                self.now += self.tick_length
+            elif self.mode == self.ACCELERATED:
+                self.now += (wall_time - self.last_wall_time) * self.speed
+            else:
+                self.now += wall_time - self.last_wall_time
+        self.last_wall_time = wall_time
+        self.ticks += 1
+        return self.now
+
+    def tick_to(self, now):
+        # replays: take the simulation time recorded for this tick
+        self.now = now
+        self.last_wall_time = time.perf_counter()
+        self.ticks += 1
+        return self.now
+
+
+class FixedTimestep:
+    # paces fixed-length simulation ticks against the wall clock for the play loop: each displayed frame runs the whole
+    # ticks that fit the time since the last frame and carries the rest, which is how far to interpolate the drawing
+    def __init__(self, tick_length=1 / 60, max_ticks=5):
+        self.tick_length = tick_length
+        self.max_ticks = max_ticks  # per frame; time past that is dropped, so slow frames slow the game down instead of snowballing
+        self.accumulator = tick_length  # the first frame runs a tick straight away
+        self.dropped_ticks = 0
+        self.last_wall_time = None
+
+    def advance(self):
+        wall_time = time.perf_counter()
+        if self.last_wall_time is not None:
+            self.accumulator += wall_time - self.last_wall_time
+        self.last_wall_time = wall_time
+        ticks = int(self.accumulator / self.tick_length)
+        if ticks > self.max_ticks:
+            self.dropped_ticks += ticks - self.max_ticks
+            self.accumulator -= (ticks - self.max_ticks) * self.tick_length
+            ticks = self.max_ticks
+        self.accumulator -= ticks * self.tick_length
+        return ticks
+
+    @property
+    def alpha(self):
+        # 0 draws the previous tick's state, 1 the latest
+        return min(self.accumulator / self.tick_length, 1.)
+
+
+class Controls:
+    # one tick of player input, read from pygame or a replay; the game never polls keys or the mouse itself
+    W, A, S, D, SHIFT, R, ESCAPE = (1 << i for i in range(7))
+    held_keys = {W: pygame.K_w, A: pygame.K_a, S: pygame.K_s, D: pygame.K_d}
+    pressed_keys = {SHIFT: pygame.K_LSHIFT, R: pygame.K_r, ESCAPE: pygame.K_ESCAPE}
+
+    def __init__(self, buttons=0, clicks=0, mouse=(0, 0)):
+        self.buttons = buttons  # held W/A/S/D, and SHIFT/R/ESCAPE pressed since the last tick
+        self.clicks = clicks
+        self.mouse = mouse
+
+    @classmethod
+    def read(cls, events):
+        keys = pygame.key.get_pressed()
+        buttons = sum(bit for bit, key in cls.held_keys.items() if keys[key])
+        clicks = 0
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                buttons |= sum(bit for bit, key in cls.pressed_keys.items() if event.key == key)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                clicks += 1
+        return cls(buttons, clicks, pygame.mouse.get_pos())
 
+    def __getitem__(self, bit):
+        return bool(self.buttons & bit)
 
-def blit_alpha(target, source, opacity):
-    x = source.rect.center[0]
-    y = source.rect.center[1]
-    surface = source.image
-    temp = pygame.Surface((surface.get_width(), surface.get_height())).convert()
-    temp.blit(target, (-x, -y))
-    temp.blit(surface, (0, 0))
-    temp.set_alpha(opacity)        
-    target.blit(temp, (x, y))
+
+class Replay:
+    # binary session log: a header, then one record per play-loop tick
+    MAGIC = b'RWR1'
+    header = np.dtype([('magic', 'S4'), ('seed', '<u4'), ('width', '<u2'), ('height', '<u2'), ('level', '<u2')])
+    tick = np.dtype([('now', '<f8'), ('buttons', 'u1'), ('clicks', 'u1'), ('x', '<i2'), ('y', '<i2')])
+
+    def __init__(self, seed, screen_shape, level, ticks=None):
+        self.seed = seed
+        self.screen_shape = tuple(screen_shape)
+        self.level = level
+        self.ticks = np.zeros(0, self.tick) if ticks is None else ticks
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        header = np.frombuffer(data, cls.header, count=1)[0]
+        if header['magic'] != cls.MAGIC:
+            raise ValueError(f'{path} is not a replay')
+        ticks = np.frombuffer(data, cls.tick, offset=cls.header.itemsize)
+        return cls(int(header['seed']), (int(header['width']), int(header['height'])), int(header['level']), ticks)
+
+    def controls(self, index):
+        tick = self.ticks[index]
+        return Controls(int(tick['buttons']), int(tick['clicks']), (int(tick['x']), int(tick['y'])))
+
+
+class ReplayRecorder:
+    def __init__(self, path, seed, screen_shape, level):
+        self.file = open(path, 'wb')
+        self.file.write(np.array([(Replay.MAGIC, seed, screen_shape[0], screen_shape[1], level)], Replay.header).tobytes())
+
+    def write(self, now, controls):
+        self.file.write(np.array([(now, controls.buttons, controls.clicks) + tuple(controls.mouse)], Replay.tick).tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class Timer:
+    def __init__(self, due, callback, interval=None):
+        self.due = due
+        self.callback = callback
+        self.interval = interval
+        self.cancelled = False
+
+
+class Scheduler:
+    # min-heap of timers on game clock time; cancelled timers are dropped when they reach the top
+    def __init__(self, clock):
+        self.clock = clock
+        self.heap = []
+        self.sequence = itertools.count()  # keeps equal due times in scheduling order
+
+    def push(self, timer):
+        heapq.heappush(self.heap, (timer.due, next(self.sequence), timer))
+        return timer
+
+    def schedule(self, delay, callback):
+        return self.push(Timer(self.clock.now + delay, callback))
+
+    def every(self, interval, callback):
+        return self.push(Timer(self.clock.now + interval, callback, interval))
+
+    def cancel(self, timer):
+        if timer is not None:
+            timer.cancelled = True
+
+    def cancel_all(self):
+        for _, _, timer in self.heap:
+            timer.cancelled = True
+        self.heap = []
+
+    def run_due(self):
+        while self.heap and self.heap[0][0] <= self.clock.now:
+            _, _, timer = heapq.heappop(self.heap)
+            if timer.cancelled:
+                continue
+            if timer.interval:
+                timer.due += timer.interval
+                self.push(timer)
+            timer.callback()
+
+
+class RotationCache:
+    # rotated copies of shared source images, keyed by (source image, angle bucket)
+    def __init__(self, buckets=360):
+        self.buckets = buckets
+        self.tables = {}
+        self.hits = 0
+        self.misses = 0
+
+    def table(self, image):
+        table = self.tables.get(image)
+        if table is None:
+            table = self.tables[image] = [None] * self.buckets
+        return table
+
+    def bucket(self, degrees):
+        return int(round(degrees * self.buckets / 360)) % self.buckets
+
+    def render(self, image, table, bucket):
+        self.misses += 1
+        table[bucket] = pygame.transform.rotate(image, bucket * 360 / self.buckets)
+        return table[bucket]
+
+    def rotate(self, image, degrees):
+        table = self.table(image)
+        bucket = self.bucket(degrees)
+        surface = table[bucket]
+        if surface is None:
+            return self.render(image, table, bucket)
+        self.hits += 1
+        return surface
+
+    def buckets_of(self, degrees):
+        return np.rint(np.asarray(degrees) * self.buckets / 360).astype('int64') % self.buckets
+
+    def rotate_many(self, image, degrees):
+        table = self.table(image)
+        buckets = self.buckets_of(degrees).tolist()
+        misses = self.misses
+        surfaces = [table[bucket] or self.render(image, table, bucket) for bucket in buckets]
+        self.hits += len(buckets) - (self.misses - misses)
+        return surfaces
+
+    def prebuild(self, image):
+        table = self.table(image)
+        for bucket in range(self.buckets):
+            if table[bucket] is None:
+                self.render(image, table, bucket)
+
+    def full_table(self, image):
+        # every rotation of image as an object array, so buckets worked out in bulk index it directly
+        self.prebuild(image)
+        surfaces = np.empty(self.buckets, dtype=object)
+        surfaces[:] = self.table(image)
+        return surfaces
+
+    def reset_counters(self):
+        self.hits = self.misses = 0
+
+
+class ScaleCache:
+    # scaled copies of shared source images, keyed by (source image, size), least recently used evicted first
+    def __init__(self, max_bytes=48 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def scale(self, image, size):
+        key = (image, size)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.surfaces[key] = pygame.transform.scale(image, size)
+        self.bytes += self.footprint(surface)
+        while self.bytes > self.max_bytes and len(self.surfaces) > 1:
+            _, evicted = self.surfaces.popitem(last=False)
+            self.bytes -= self.footprint(evicted)
+            self.evictions += 1
+        return surface
+
+    def prewarm(self, image, sizes):
+        for size in sizes:
+            if (image, size) not in self.surfaces:
+                self.scale(image, size)
+
+    @staticmethod
+    def footprint(surface):
+        return surface.get_pitch() * surface.get_height()
+
+    def reset_counters(self):
+        self.hits = self.misses = self.evictions = 0
 
 
 class RWSprite(pygame.sprite.Sprite):
@@ -36,17 +462,15 @@ class RWSprite(pygame.sprite.Sprite):
         self.game = game
         self.pos = pos
 
+    gravity_vector = None  # set by GravityEngine.apply once per frame
+    prev_center = None  # rect.center at the start of the last tick, for interpolated drawing
+    max_interpolated_step = 100  # px per tick; longer moves are wraps or resets and are drawn where they land
+
     def calculate_gravity(self):
-        vector = np.array([0., 0.])
-        for black_hole in self.game.black_hole_group:
-            relative_pos = self.pos - black_hole.pos
-            angle = self.get_angle_from_vector(relative_pos)
-            distance = math.sqrt(relative_pos[0]**2 + relative_pos[1]**2)
-            vector += np.array([-self.GRAVITATIONAL_CONSTANT / math.copysign(distance**1.1, rel) if distance != 0 else 0 for rel in relative_pos])
-        net_gravity = math.sqrt(vector[0]**2 + vector[1]**2)
-        if net_gravity > self.MAX_GRAVITY:
-            vector *= self.MAX_GRAVITY / net_gravity
-        return vector
+        if self.gravity_vector is not None:
+            vector, self.gravity_vector = self.gravity_vector, None
+            return vector
+        return self.game.gravity_engine.calculate([self.pos])[0]
 
     @staticmethod
     def get_angle_from_vector(vector):
@@ -60,104 +484,605 @@ class RWSprite(pygame.sprite.Sprite):
             angle += math.pi
         return -angle
 
+    @staticmethod
+    def get_angles_from_vectors(vectors):
+        # vectorized get_angle_from_vector, branch for branch
+        x, y = vectors[:, 0], vectors[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            angle = np.where(x != 0, np.arctan(y / x), np.where(y > 0, -math.pi / 2, math.pi / 2))
+        angle = np.where(x < 0, angle + math.pi, angle)
+        return -angle
+
     @staticmethod
     def get_unit_vector_from_angle(angle):
         return np.array([math.cos(angle), -math.sin(angle)])
 
+    @staticmethod
+    def get_unit_vectors_from_angles(angles):
+        # vectorized get_unit_vector_from_angle, (N,) -> (N, 2)
+        return np.stack([np.cos(angles), -np.sin(angles)], axis=-1)
+
     def center_to_pos(self):
         self.rect.center = [int(p) for p in self.pos]
 
+    @staticmethod
+    def centred_topleft(pos, size):
+        # topleft of rects of size centred on the truncated positions, as center_to_pos places them; (..., 2)
+        return np.trunc(pos).astype('int64') - size // 2
+
     def wrap_pos(self):
-        if self.pos[0] < 0:
-            self.pos = (self.game.screen_shape[0], self.game.screen_shape[1] - self.pos[1])
-        elif self.pos[0] > self.game.screen_shape[0]:
-            self.pos = (0, self.game.screen_shape[1] - self.pos[1])
-        if self.pos[1] < 0:
-            self.pos = (self.game.screen_shape[0] - self.pos[0], self.game.screen_shape[1])
-        elif self.pos[1] > self.game.screen_shape[1]:
-            self.pos = (self.game.screen_shape[0] - self.pos[0], 0)
+        self.pos = self.wrapped(self.pos, self.game.screen_shape)
+
+    @staticmethod
+    def wrapped(pos, screen_shape):
+        # leaving through one side re-enters through the opposite one, mirrored; pos: (..., 2)
+        width, height = screen_shape
+        x, y = pos[..., 0], pos[..., 1]
+        left, right = x < 0, x > width
+        x = np.where(left, width, np.where(right, 0, x))
+        y = np.where(left | right, height - y, y)
+        top, bottom = y < 0, y > height
+        x = np.where(top | bottom, width - x, x)
+        y = np.where(top, height, np.where(bottom, 0, y))
+        return np.stack([x, y], axis=-1).astype('float64')
 
     def limit_pos_to_screen(self):
-        new_pos = self.pos + self.velocity
-        for i in range(2):
-            if new_pos[i] < 0:
-                new_pos[i] = 0
-                if self.velocity[i] <= 0:
-                    self.velocity[i] = 0
-                self.velocity[i] = 0
-            elif new_pos[i] > self.game.screen_shape[i]:
-                new_pos[i] = self.game.screen_shape[i]
-                if self.velocity[i] >= 0:
-                    self.velocity[i] = 0
-        self.pos = new_pos
+        self.pos, self.velocity = self.limited_to_screen(self.pos, self.velocity, self.game.screen_shape)
+
+    @staticmethod
+    def limited_to_screen(pos, velocity, screen_shape):
+        # one step of velocity, stopped at the screen edges; pos, velocity: (..., 2)
+        new_pos = pos + velocity
+        low, high = new_pos < 0, new_pos > screen_shape
+        new_pos = np.where(low, 0., np.where(high, screen_shape, new_pos))
+        velocity = np.where(low | (high & (velocity >= 0)), 0., velocity)
+        return new_pos, velocity
 
     def kill_if_offscreen(self):
-        if not 0 <= self.rect.center[0] <= self.game.screen_shape[0] or not 0 <= self.rect.center[1] <= self.game.screen_shape[1]:
+        if not self.on_screen(np.array(self.rect.center), self.game.screen_shape):
             self.kill()
 
+    @staticmethod
+    def on_screen(pos, screen_shape):
+        # whether each truncated centre is on the screen, edges included; pos: (..., 2)
+        centers = np.trunc(pos)
+        return ((0 <= centers) & (centers <= screen_shape)).all(axis=-1)
+
     def kill_if_in_black_hole(self):
-        if pygame.sprite.spritecollide(self, self.game.black_hole_group, False):
+        if self.game.spatial_hash.sprites_colliding(self.rect, 'black_holes'):
             self.kill()
-    
+
     @staticmethod
     def hypotenuse(vector):
         return math.sqrt(vector[0]**2 + vector[1]**2)
 
+    @staticmethod
+    def rects_collide(topleft, size, other_topleft, other_size):
+        # vectorized pygame.Rect.colliderect, rects as (..., 2) topleft and size arrays broadcast against each other
+        return ((size > 0).all(axis=-1) & (other_size > 0).all(axis=-1)
+                & (topleft < other_topleft + other_size).all(axis=-1) & (topleft + size > other_topleft).all(axis=-1))
+
+    @staticmethod
+    def sweeps_collide(start, end, size, topleft, target_size):
+        # boxes of size (N, 2) moving with their centres from start to end (N, 2) against fixed boxes at topleft with
+        # target_size (N, 2): a slab test of the centre segment against each target grown by half the moving box
+        low = topleft - size / 2
+        high = topleft + target_size + size / 2
+        step = end - start
+        with np.errstate(divide='ignore', invalid='ignore'):
+            near, far = (low - start) / step, (high - start) / step
+        still = step == 0
+        inside = (low < start) & (start < high)
+        enter = np.where(still, np.where(inside, -np.inf, np.inf), np.minimum(near, far)).max(axis=1)
+        leave = np.where(still, np.where(inside, np.inf, -np.inf), np.maximum(near, far)).min(axis=1)
+        return (enter < leave) & (enter <= 1) & (leave >= 0)
+
+
+class BarnesHutTree:
+    # quadtree over black hole positions, built on the first walk level by level from Morton codes down to the first
+    # level where every node is a leaf; each node keeps its hole count, centroid, bounding box and radius around the
+    # centroid so whole nodes can stand in for their holes
+    MAX_DEPTH = 10
+    LEAF_SIZE = 8  # holes in a node before it is split
+    DIRECT_PAIRS = 2000000  # below this many entity-hole pairs summing them all beats walking the tree
+    CELL_ENTITIES = 16  # entities per cell on average; a cell walks the tree once for all of its entities
+
+    def __init__(self, black_holes, leaf_size=LEAF_SIZE):
+        self.black_holes = np.asarray(black_holes, dtype='float64').reshape(-1, 2)
+        self.leaf_size = leaf_size
+        self.holes = None  # Morton ordered black_holes, set with the nodes by build()
+
+    def build(self):
+        black_holes, leaf_size = self.black_holes, self.leaf_size
+        low = black_holes.min(axis=0)
+        span = max(float((black_holes.max(axis=0) - low).max()), 1e-9)
+        cells = np.minimum(((black_holes - low) / span * 2**self.MAX_DEPTH).astype('int64'), 2**self.MAX_DEPTH - 1)
+        codes = self.spread_bits(cells[:, 0]) | self.spread_bits(cells[:, 1]) << 1
+        order = np.argsort(codes, kind='stable')
+        codes, self.holes = codes[order], black_holes[order]
+
+        starts, ends, levels = [], [], []
+        for level in range(self.MAX_DEPTH + 1):
+            prefix = codes >> 2 * (self.MAX_DEPTH - level)
+            level_starts = np.flatnonzero(np.r_[True, prefix[1:] != prefix[:-1]])
+            starts.append(level_starts)
+            ends.append(np.r_[level_starts[1:], len(codes)])
+            levels.append(np.full(len(level_starts), level))
+            if (ends[-1] - level_starts <= leaf_size).all():
+                break
+        depth = len(starts) - 1
+        offsets = np.cumsum([0] + [len(level_starts) for level_starts in starts])
+        # children of a node are the next level's nodes starting inside its range of sorted holes
+        self.first_child = np.concatenate([offsets[level + 1] + np.searchsorted(starts[level + 1], starts[level]) for level in range(depth)]
+                                          + [np.zeros(len(starts[-1]), dtype='int64')])
+        self.last_child = np.concatenate([offsets[level + 1] + np.searchsorted(starts[level + 1], ends[level]) for level in range(depth)]
+                                         + [np.zeros(len(starts[-1]), dtype='int64')])
+        self.start, self.end, level = np.concatenate(starts), np.concatenate(ends), np.concatenate(levels)
+        self.count = self.end - self.start
+        self.leaf = (self.count <= leaf_size) | (level == depth)
+
+        centroid = np.concatenate([np.add.reduceat(self.holes, level_starts) for level_starts in starts]) / self.count[:, np.newaxis]
+        low = np.concatenate([np.minimum.reduceat(self.holes, level_starts) for level_starts in starts])
+        high = np.concatenate([np.maximum.reduceat(self.holes, level_starts) for level_starts in starts])
+        size = (high - low).max(axis=1)
+        offsets_to_centroid = np.tile(self.holes, (depth + 1, 1)) - np.repeat(centroid, self.count, axis=0)
+        node_starts = self.start + len(codes) * level
+        radius = np.maximum.reduceat(np.hypot(offsets_to_centroid[:, 0], offsets_to_centroid[:, 1]), node_starts)
+        # second moments of the holes about the centroid, xx, xy and yy, for the quadrupole term
+        moments = np.add.reduceat(offsets_to_centroid[:, [0, 0, 1]] * offsets_to_centroid[:, [0, 1, 1]], node_starts)
+        self.bounds = np.column_stack([centroid, low, high, size, radius, moments])  # gathered together per visit
+
+    @staticmethod
+    def spread_bits(values):
+        # 0b1111 -> 0b01010101, for interleaving x and y into Morton codes
+        values = (values | values << 8) & 0x00FF00FF
+        values = (values | values << 4) & 0x0F0F0F0F
+        values = (values | values << 2) & 0x33333333
+        return (values | values << 1) & 0x55555555
+
+    @staticmethod
+    def expand(pairs, first, count):
+        # (particle, first + k) for every pair and k in range(count) of that pair
+        index = np.repeat(np.arange(len(pairs)), count)
+        return pairs[index], first[index] + np.arange(len(index)) - np.repeat(np.cumsum(count) - count, count)
+
+    def field(self, positions, theta):
+        # positions: (N, 2) -> unclamped accelerations (N, 2) and a per-component bound (N,) on their error against the
+        # exact sum. Entities are grouped into cells that walk the tree together, deciding each axis on its own: a node,
+        # or a single hole of a leaf, is expanded to first order about the cell centre for x when it lies wholly left or
+        # right of the cell (so every hole's copysign agrees for every entity in it) and its size plus the cell's is below
+        # theta times its distance, and likewise for y. A node straddling the cell's column still gives its y pull that
+        # way and is only opened for x. Whatever is left is summed exactly for each entity. Below DIRECT_PAIRS every pair
+        # is summed instead, which is exact and cheaper there
+        N = len(positions)
+        if N * len(self.black_holes) < self.DIRECT_PAIRS or len(self.black_holes) <= self.leaf_size:
+            return self.direct(positions, self.black_holes), np.zeros(N)
+        if self.holes is None:
+            self.build()
+        G = GravityEngine.GRAVITATIONAL_CONSTANT
+        cell_of, cell_low, cell_high = self.cells(positions)
+        M = len(cell_low)
+        centre = (cell_low + cell_high) / 2
+        reach = np.hypot(*((cell_high - cell_low) / 2).T)  # no entity is further than this from its cell centre
+        far_cells, far_nodes, far_axes, leaf_cells, leaf_nodes, leaf_axes = [], [], [], [], [], []
+        cells, nodes, axes = np.arange(M), np.zeros(M, dtype='int64'), np.ones((M, 2), dtype=bool)
+        while len(cells):
+            centroid, low, high, size, radius, _ = np.split(self.bounds[nodes], (2, 4, 6, 7, 8), axis=1)
+            accept = self.expandable(cell_low[cells], cell_high[cells], reach[cells], centroid, low, high, size[:, 0],
+                                     radius[:, 0], theta) & axes
+            accepted = accept.any(axis=1)
+            far_cells.append(cells[accepted])
+            far_nodes.append(nodes[accepted])
+            far_axes.append(accept[accepted])
+            axes = axes & ~accept
+            pending = axes.any(axis=1)
+            leaves = pending & self.leaf[nodes]
+            leaf_cells.append(cells[leaves])
+            leaf_nodes.append(nodes[leaves])
+            leaf_axes.append(axes[leaves])
+            opened = pending & ~leaves
+            first_child = self.first_child[nodes[opened]]
+            children = self.last_child[nodes[opened]] - first_child
+            axes = np.repeat(axes[opened], children, axis=0)
+            cells, nodes = self.expand(cells[opened], first_child, children)
+
+        # the holes of the leaves reached, one by one
+        nodes = np.concatenate(leaf_nodes)
+        cells, holes = self.expand(np.concatenate(leaf_cells), self.start[nodes], self.count[nodes])
+        axes = np.repeat(np.concatenate(leaf_axes), self.count[nodes], axis=0)
+        hole = self.holes[holes]
+        accept = self.expandable(cell_low[cells], cell_high[cells], reach[cells], hole, hole, hole, 0, 0, theta) & axes
+        accepted = accept.any(axis=1)
+        near_axes = axes & ~accept
+
+        # far: every expandable node and hole, as its centroid plus the quadrupole of its holes about it, summed into a
+        # second order expansion per cell: value, gradient and Hessian about the cell centre
+        nodes = np.concatenate(far_nodes)
+        source = np.concatenate([self.bounds[nodes, :2], hole[accepted]])
+        count = np.concatenate([self.count[nodes], np.ones(accepted.sum(), dtype='int64')])
+        near = np.concatenate([self.bounds[nodes, 7], np.zeros(accepted.sum())])
+        moments = np.concatenate([self.bounds[nodes, 8:], np.zeros((accepted.sum(), 3))])
+        source_axes = np.concatenate(far_axes + [accept[accepted]])
+        source_cells = np.concatenate(far_cells + [cells[accepted]])
+        relative_x, relative_y = (centre[source_cells] - source).T
+        distance_sq = relative_x**2 + relative_y**2
+        pull = np.copysign(count[:, np.newaxis] * source_axes, np.column_stack([relative_x, relative_y])) * -G * distance_sq[:, np.newaxis]**-0.55
+        # the Hessian of |r|**-1.1 is |r|**-3.1 (3.41 r r' / |r|**2 - 1.1 I), and the gradient -1.1 |r|**-3.1 r
+        xx, xy, yy = relative_x**2 / distance_sq, relative_x * relative_y / distance_sq, relative_y**2 / distance_sq
+        moment = moments[:, 0] + moments[:, 2]
+        quadrupole = (3.41 * (moments[:, 0] * xx + 2 * moments[:, 1] * xy + moments[:, 2] * yy) - 1.1 * moment) / (2 * count * distance_sq)
+        curve = pull / distance_sq[:, np.newaxis]
+        weights = [pull[:, 0] * (1 + quadrupole), pull[:, 1] * (1 + quadrupole)]
+        for component in range(2):
+            weights += [-1.1 * curve[:, component] * relative_x, -1.1 * curve[:, component] * relative_y]
+        for component in range(2):
+            weights += [curve[:, component] * (3.41 * xx - 1.1), curve[:, component] * 3.41 * xy, curve[:, component] * (3.41 * yy - 1.1)]
+        expansion = np.stack([np.bincount(source_cells, weight, minlength=M) for weight in weights], axis=1)[cell_of]
+        offset_x, offset_y = (positions - centre[cell_of]).T
+        vector = np.stack([expansion[:, 2 + 2 * k] * offset_x + expansion[:, 3 + 2 * k] * offset_y
+                           + (expansion[:, 6 + 3 * k] * offset_x**2 + 2 * expansion[:, 7 + 3 * k] * offset_x * offset_y
+                              + expansion[:, 8 + 3 * k] * offset_y**2) / 2 for k in range(2)], axis=1) + expansion[:, :2]
+        # what is left is third order. No entity comes closer than gap to a centroid or gap - near to its holes, and the
+        # third derivative of |r|**-1.1 along any direction is at most 7.161 |r|**-4.1, so the quadrupole misses by at
+        # most a sixth of that times the sum of the holes' cubed offsets (near times the moment), the quadrupole moving
+        # with the entity by half of it times the moment and the offset, and the expansion by a sixth times the offset cubed
+        distance = np.sqrt(distance_sq)
+        gap = distance - reach[source_cells]
+        spread = 1.1935 * (gap - near)**-4.1 * near * moment
+        offset = np.hypot(offset_x, offset_y)
+        bound = (np.bincount(source_cells, G * spread, minlength=M)[cell_of]
+                 + np.bincount(source_cells, G * 3.5805 * gap**-4.1 * moment, minlength=M)[cell_of] * offset
+                 + np.bincount(source_cells, G * count * 1.1935 * gap**-4.1, minlength=M)[cell_of] * offset**3)
+
+        # near: the rest of the leaf holes, exactly, for the axes still wanted
+        near_rows = near_axes.any(axis=1)
+        cells, holes, axes = cells[near_rows], holes[near_rows], near_axes[near_rows]
+        order = np.argsort(cells, kind='stable')
+        holes, axes = holes[order], axes[order] * -G
+        per_cell = np.bincount(cells, minlength=M)
+        particles, rows = self.expand(np.arange(N), (np.cumsum(per_cell) - per_cell)[cell_of], per_cell[cell_of])
+        relative_x = positions[particles, 0] - self.holes[holes[rows], 0]
+        relative_y = positions[particles, 1] - self.holes[holes[rows], 1]
+        magnitude = self.magnitudes(relative_x, relative_y)
+        vector[:, 0] += np.bincount(particles, np.copysign(magnitude, relative_x) * axes[rows, 0], minlength=N)
+        vector[:, 1] += np.bincount(particles, np.copysign(magnitude, relative_y) * axes[rows, 1], minlength=N)
+        return vector, bound
+
+    def cells(self, positions):
+        # square cells sized for CELL_ENTITIES entities each over the positions' bounding box -> each position's cell
+        # (N,) and the bounding box of the positions in each occupied cell, (M, 2) low and high corners
+        low = positions.min(axis=0)
+        span = positions.max(axis=0) - low + 1
+        cell_size = math.sqrt(span[0] * span[1] * self.CELL_ENTITIES / len(positions))
+        cells = ((positions - low) // cell_size).astype('int64')
+        _, cell_of = np.unique(cells[:, 0] * (cells[:, 1].max() + 1) + cells[:, 1], return_inverse=True)
+        order = np.argsort(cell_of, kind='stable')
+        first = np.flatnonzero(np.r_[True, np.diff(cell_of[order]) != 0])
+        return cell_of, np.minimum.reduceat(positions[order], first), np.maximum.reduceat(positions[order], first)
+
+    @staticmethod
+    def expandable(cell_low, cell_high, reach, centroid, low, high, size, radius, theta):
+        # (K, 2): per axis, whether a node (a hole: size and radius 0) can be expanded about the cell centre: wholly on
+        # one side of the cell along that axis, clear of every entity in it, and small enough for its distance
+        relative_pos = (cell_low + cell_high) / 2 - centroid
+        distance_sq = relative_pos[:, 0]**2 + relative_pos[:, 1]**2
+        small = ((size + 2 * reach)**2 < theta**2 * distance_sq) & ((radius + reach)**2 < distance_sq)
+        return ((cell_high < low) | (cell_low > high)) & small[:, np.newaxis]
+
+    @staticmethod
+    def magnitudes(relative_x, relative_y):
+        # |r|**-1.1 per pair, 0 for a hole right on the position as in GravityEngine.field
+        distance_sq = relative_x * relative_x + relative_y * relative_y
+        with np.errstate(divide='ignore'):
+            magnitude = distance_sq**-0.55
+        magnitude[distance_sq == 0] = 0
+        return magnitude
+
+    @classmethod
+    def direct(cls, positions, holes):
+        # every pair, (N, H) at a time: the exact sum unclamped, to rounding
+        relative_x = positions[:, 0:1] - holes[:, 0]
+        relative_y = positions[:, 1:2] - holes[:, 1]
+        magnitude = cls.magnitudes(relative_x, relative_y)
+        G = GravityEngine.GRAVITATIONAL_CONSTANT
+        return np.stack([np.copysign(magnitude, relative_x).sum(axis=1), np.copysign(magnitude, relative_y).sum(axis=1)], axis=1) * -G
+
+
+class GravityGrid:
+    # the exact pull sampled every spacing px over the screen; lookups interpolate bilinearly between the four
+    # surrounding samples and clamp. Interpolating across a hole's row or column would smear the sign flip of its pull
+    # there, so entities in those cells take that one hole's pull exactly instead
+    NEAR_CELLS = 2  # cells around a black hole whose entities take its pull exactly too
+    DIRECT_HOLES = 6  # up to this many black holes summing them all is no slower than a lookup
+    DIRECT_ENTITIES = 2000  # fewer entities than this are summed exactly, cheaper than keeping the grid up to date
+
+    def __init__(self, black_holes, screen_shape, spacing, tolerance):
+        self.black_holes = np.array(black_holes, dtype='float64').reshape(-1, 2)  # where each hole was sampled
+        self.current = self.black_holes.copy()  # where each hole is now
+        self.spacing = spacing
+        self.tolerance = tolerance
+        self.owed = 0
+        self.shape = np.ceil(np.asarray(screen_shape) / spacing).astype('int64') + 1  # samples per axis, covering the far edges
+        xs, ys = np.meshgrid(np.arange(self.shape[0]) * spacing, np.arange(self.shape[1]) * spacing, indexing='ij')
+        self.points = np.stack([xs, ys], axis=-1).reshape(-1, 2).astype('float64')
+        self.samples = GravityEngine.pull(self.points, self.black_holes).reshape(self.shape[0], self.shape[1], 2)
+        self.straddled()
+
+    def update(self, black_holes):
+        # black holes move once per frame; each move resamples the stalest holes, as many as keep every hole within
+        # tolerance px of where it was sampled, so the cost of following them is spread evenly over the frames
+        if black_holes.shape != self.black_holes.shape:
+            return False
+        if np.array_equal(black_holes, self.current):
+            return True
+        step = np.hypot(*(black_holes - self.current).T).max()
+        drift = np.hypot(*(black_holes - self.black_holes).T)
+        self.owed += len(drift) * step / self.tolerance  # holes to resample per frame at this speed, carried over
+        count = min(max(int(self.owed), int((drift > self.tolerance).sum())), len(drift))
+        self.owed = min(self.owed - count, 1)  # after a gap in the calls every hole was resampled, none stays owed
+        for hole in np.argsort(-drift, kind='stable')[:count]:
+            self.samples -= GravityEngine.pull(self.points, self.black_holes[hole:hole + 1]).reshape(self.samples.shape)
+            self.samples += GravityEngine.pull(self.points, black_holes[hole:hole + 1]).reshape(self.samples.shape)
+            self.black_holes[hole] = black_holes[hole]
+        self.current = black_holes.copy()
+        self.straddled()
+        return True
+
+    def straddled(self):
+        # per black hole the columns and rows of cells its x and y cross between where it was sampled and where it is
+        # now, and around them the block of cells where its pull bends too sharply to interpolate, indexed by column,
+        # row and cell so that a lookup finds the few holes it has to correct for
+        cells = self.shape - 1
+        first = np.ceil(np.minimum(self.black_holes, self.current) / self.spacing).astype('int64') - 1
+        last = np.floor(np.maximum(self.black_holes, self.current) / self.spacing).astype('int64') + 1  # exclusive
+        self.block_low, self.block_high = np.clip(first - self.NEAR_CELLS, 0, cells), np.clip(last + self.NEAR_CELLS, 0, cells)
+        first, last = np.clip(first, 0, cells), np.clip(last, 0, cells)
+        holes = np.arange(len(first))
+        self.columns = self.indexed(*BarnesHutTree.expand(holes, first[:, 0], last[:, 0] - first[:, 0]), cells[0])
+        self.rows = self.indexed(*BarnesHutTree.expand(holes, first[:, 1], last[:, 1] - first[:, 1]), cells[1])
+        block = self.block_high - self.block_low
+        holes, columns = BarnesHutTree.expand(holes, self.block_low[:, 0], block[:, 0])
+        pairs, rows = BarnesHutTree.expand(np.arange(len(holes)), self.block_low[holes, 1], block[holes, 1])
+        self.blocks = self.indexed(holes[pairs], columns[pairs] * cells[1] + rows, cells[0] * cells[1])
+
+    @staticmethod
+    def indexed(holes, keys, size):
+        # holes grouped by key: holes[starts[key]:starts[key + 1]] are the ones listed under key
+        order = np.argsort(keys, kind='stable')
+        return np.r_[0, np.cumsum(np.bincount(keys, minlength=size))], holes[order]
+
+    @staticmethod
+    def listed(index, keys):
+        # (entity, hole) for every hole listed under each entity's key
+        starts, holes = index
+        particles, slots = BarnesHutTree.expand(np.arange(len(keys)), starts[keys], starts[keys + 1] - starts[keys])
+        return particles, holes[slots]
+
+    @staticmethod
+    def bilinear(samples, fx, fy):
+        # samples: the (K, 2) values at the four corners, in x, y order (0, 0), (1, 0), (0, 1), (1, 1)
+        return (samples[0] * (1 - fx) + samples[1] * fx) * (1 - fy) + (samples[2] * (1 - fx) + samples[3] * fx) * fy
+
+    @staticmethod
+    def hole_pull(positions, black_holes):
+        # the pull of one black hole on one position, per row, before the clamp
+        relative_pos = positions - black_holes
+        magnitude = BarnesHutTree.magnitudes(relative_pos[:, 0], relative_pos[:, 1])
+        return np.copysign(magnitude[:, np.newaxis], relative_pos) * -GravityEngine.GRAVITATIONAL_CONSTANT
+
+    def lookup(self, positions):
+        # positions: (N, 2) -> (N, 2); positions off the screen take the nearest edge's samples. Each hole whose row or
+        # column the entity's cell straddles, or whose block it is in, is taken out of the interpolation and added back
+        # exactly, so the cost per entity grows only with the holes that close to it
+        cells = np.clip(positions / self.spacing, 0, self.shape - 1)
+        corner = np.minimum(cells.astype('int64'), self.shape - 2)
+        fraction = cells - corner
+        x, y = corner[:, 0], corner[:, 1]
+        fx, fy = fraction[:, 0:1], fraction[:, 1:2]
+        samples = self.samples
+        vector = self.bilinear((samples[x, y], samples[x + 1, y], samples[x, y + 1], samples[x + 1, y + 1]), fx, fy)
+
+        # a hole's column or row is corrected for outside its block, which covers both where they cross
+        column_particles, column_holes = self.listed(self.columns, x)
+        outside = (y[column_particles] < self.block_low[column_holes, 1]) | (y[column_particles] >= self.block_high[column_holes, 1])
+        row_particles, row_holes = self.listed(self.rows, y)
+        beside = (x[row_particles] < self.block_low[row_holes, 0]) | (x[row_particles] >= self.block_high[row_holes, 0])
+        block_particles, block_holes = self.listed(self.blocks, x * (self.shape[1] - 1) + y)
+        particles = np.concatenate([column_particles[outside], row_particles[beside], block_particles])
+        holes = np.concatenate([column_holes[outside], row_holes[beside], block_holes])
+        if len(particles):
+            corners = [(corner[particles] + offset) * self.spacing for offset in ((0, 0), (1, 0), (0, 1), (1, 1))]
+            sampled = self.bilinear([self.hole_pull(point, self.black_holes[holes]) for point in corners],
+                                    fx[particles], fy[particles])
+            correction = self.hole_pull(positions[particles], self.current[holes]) - sampled
+            vector[:, 0] += np.bincount(particles, correction[:, 0], minlength=len(positions))
+            vector[:, 1] += np.bincount(particles, correction[:, 1], minlength=len(positions))
+        return GravityEngine.clamped(vector)
+
+
+class GravityEngine:
+    GRAVITATIONAL_CONSTANT = RWSprite.GRAVITATIONAL_CONSTANT
+    MAX_GRAVITY = RWSprite.MAX_GRAVITY
+    EXACT, CUTOFF, BARNES_HUT, GRID = 'exact', 'cutoff', 'barnes_hut', 'grid'
+
+    def __init__(self, game):
+        self.game = game
+        self.tree = None  # BarnesHutTree of the last black hole positions seen
+        self.grid = None  # GravityGrid, resampled when it goes stale
+        self.error_bound = 0.  # largest per-component error bound CUTOFF or BARNES_HUT reported since it was zeroed
+
+    def black_hole_positions(self):
+        return np.array([black_hole.pos for black_hole in self.game.black_hole_group], dtype='float64').reshape(-1, 2)
+
+    def calculate(self, positions):
+        # positions: (N, 2) -> accelerations: (N, 2), with the approximation GameParams.gravity_mode asks for
+        positions = np.asarray(positions, dtype='float64').reshape(-1, 2)
+        black_holes = self.black_hole_positions()
+        params = self.game.game_params
+        if params.gravity_mode == self.EXACT or not len(black_holes):
+            return self.field(positions, black_holes)
+        if params.gravity_mode == self.GRID:
+            if len(positions) < GravityGrid.DIRECT_ENTITIES or len(black_holes) <= GravityGrid.DIRECT_HOLES:
+                return self.field(positions, black_holes)  # the grid catches up on the next call it serves
+            if (self.grid is None or (self.grid.spacing, self.grid.tolerance) != (params.gravity_grid_spacing, params.gravity_grid_tolerance)
+                    or not self.grid.update(black_holes)):
+                self.grid = GravityGrid(black_holes, self.game.screen_shape, params.gravity_grid_spacing, params.gravity_grid_tolerance)
+            return self.grid.lookup(positions)
+        if params.gravity_mode == self.CUTOFF and self.cutoff_error(len(black_holes), params.gravity_cutoff) <= self.MAX_GRAVITY:
+            vector, bound = self.cutoff_field(positions, black_holes, params.gravity_cutoff)
+        else:  # BARNES_HUT, or a CUTOFF setup_game found unsafe for this many black holes
+            if self.tree is None or not np.array_equal(self.tree.black_holes, black_holes):
+                self.tree = BarnesHutTree(black_holes)  # black holes move once per frame, calculate runs several times
+            vector, bound = self.tree.field(positions, params.gravity_theta)
+        if len(bound):
+            self.error_bound = max(self.error_bound, float(bound.max()))
+        return self.clamped(vector)
+
+    @classmethod
+    def field(cls, positions, black_holes, present=None):
+        # positions: (..., N, 2), black_holes: (..., H, 2), present: optional (..., H) mask -> (..., N, 2)
+        return cls.clamped(cls.pull(positions, black_holes, present))
+
+    @classmethod
+    def pull(cls, positions, black_holes, present=None):
+        # the net pull before the MAX_GRAVITY clamp
+        relative_pos = positions[..., :, np.newaxis, :] - black_holes[..., np.newaxis, :, :]
+        distance = np.sqrt(relative_pos[..., 0]**2 + relative_pos[..., 1]**2)
+        with np.errstate(divide='ignore'):
+            pull = -cls.GRAVITATIONAL_CONSTANT / np.copysign(distance[..., np.newaxis]**1.1, relative_pos)
+        pull[distance == 0] = 0
+        if present is not None:
+            pull *= present[..., np.newaxis, :, np.newaxis]
+        return pull.sum(axis=-2)
+
+    @classmethod
+    def clamped(cls, vector):
+        # MAX_GRAVITY clamp on the net pull; being a projection onto a disc it never grows an approximation's error
+        net_gravity = np.sqrt(vector[..., 0]**2 + vector[..., 1]**2)
+        over = net_gravity > cls.MAX_GRAVITY
+        vector[over] *= (cls.MAX_GRAVITY / net_gravity[over])[:, np.newaxis]
+        return vector
+
+    @classmethod
+    def cutoff_error(cls, black_holes, cutoff):
+        # the furthest cutoff_field can be from the exact pull, as a norm, for a count of black holes: all of them out
+        # of reach. The x**-1.1 pull falls off too slowly for the far holes to ever stop mattering, so CUTOFF is only
+        # safe while this stays below MAX_GRAVITY (about 40 holes at 400 px)
+        return math.sqrt(2) * black_holes * cls.GRAVITATIONAL_CONSTANT / cutoff**1.1
+
+    @classmethod
+    def cutoff_field(cls, positions, black_holes, cutoff):
+        # positions: (N, 2) -> unclamped accelerations (N, 2) from the holes within cutoff only, and a per-component
+        # bound (N,) on the error: every ignored hole pulls at most G / cutoff**1.1 along each axis. Holes are binned
+        # into cutoff-sized cells so each position only looks at the 3x3 cells around its own
+        low = black_holes.min(axis=0)
+        cells = ((black_holes - low) // cutoff).astype('int64')
+        columns, rows = cells.max(axis=0) + 1
+        keys = cells[:, 0] * rows + cells[:, 1]
+        order = np.argsort(keys, kind='stable')
+        per_cell = np.bincount(keys, minlength=columns * rows)
+        slot = np.arange(len(keys)) - (np.cumsum(per_cell) - per_cell)[keys[order]]
+        table = np.full((columns * rows + 1, max(per_cell.max(), 1)), -1)  # last row: outside the grid, no holes
+        table[keys[order], slot] = order
+
+        position_cells = np.floor((positions - low) / cutoff).astype('int64')
+        neighbours = position_cells[:, np.newaxis] + np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+        inside = ((neighbours >= 0) & (neighbours < (columns, rows))).all(axis=-1)
+        neighbour_keys = np.where(inside, neighbours[..., 0] * rows + neighbours[..., 1], columns * rows)
+        particles, holes = np.nonzero(table[neighbour_keys].reshape(len(positions), -1) >= 0)
+        holes = table[neighbour_keys].reshape(len(positions), -1)[particles, holes]
+
+        relative_pos = positions[particles] - black_holes[holes]
+        distance_sq = relative_pos[:, 0]**2 + relative_pos[:, 1]**2
+        used = (distance_sq < cutoff**2) & (distance_sq > 0)
+        particles, relative_pos = particles[used], relative_pos[used]
+        pull = np.copysign(distance_sq[used]**-0.55, relative_pos.T) * -cls.GRAVITATIONAL_CONSTANT
+        vector = np.stack([np.bincount(particles, pull[0], minlength=len(positions)),
+                           np.bincount(particles, pull[1], minlength=len(positions))], axis=1).astype('float64')  # int with no pairs
+        ignored = len(black_holes) - np.bincount(particles, minlength=len(positions))
+        bound = ignored * cls.GRAVITATIONAL_CONSTANT / cutoff**1.1
+        return vector, bound
+
+    def apply(self, sprites):
+        sprites = list(sprites)
+        if sprites:
+            vectors = self.calculate([sprite.pos for sprite in sprites])
+            for sprite, vector in zip(sprites, vectors):
+                sprite.gravity_vector = vector
+
 
 class DroneBase(RWSprite):
-    torpedo_sound = pygame.mixer.Sound('assets/torpedo.wav')
+    torpedo_sound = LazySound('torpedo.wav')
     speed = 3
+    drift = 3  # speed along the edge it enters through, either way
     drag = 0.1
+    lifetime = 10
     death_time = None
 
     def __init__(self, game):
         self.game = game
         self.random_init()
         super().__init__(self.pos, self.velocity, game)
-        self.init_time = time.time()
+        self.init_time = self.game.clock.now
         self.last_fired_time = self.init_time
 
     def random_init(self):
-        if random.choice([True, False]):
-            self.pos = np.array([random.choice([0, self.game.screen_shape[0]]), random.randrange(0, self.game.screen_shape[1])], dtype='float64')
-            self.velocity = np.array([self.speed * (1 if self.pos[0] == 0 else -1), random.choice([-3, 3])], dtype='float64')
+        rng = self.game.rng
+        side = rng.choice([True, False])
+        if side:
+            far, along = rng.choice([0, 1]), rng.randrange(0, self.game.screen_shape[1])
         else:
-            self.pos = np.array([random.randrange(0, self.game.screen_shape[0]), random.choice([0, screen_shape[1]])], dtype='float64')
-            self.velocity = np.array([random.choice([-3, 3]), self.speed * (1 if self.pos[1] == 0 else -1)], dtype='float64')
+            along, far = rng.randrange(0, self.game.screen_shape[0]), rng.choice([0, 1])
+        drift = rng.choice([-self.drift, self.drift])
+        self.pos, self.velocity = self.entry(side, far, along, drift, self.speed, self.game.screen_shape)
         self.rect = self.image.get_rect()
         self.center_to_pos()
-    
+
+    @staticmethod
+    def entry(side, far, along, drift, speed, screen_shape):
+        # starting pos and velocity on an edge: the left/right edge when side, else top/bottom, the far one (right or
+        # bottom) when far, at along on it; heading inwards at speed while drifting along the edge. Scalars or (N,)
+        width, height = screen_shape
+        inward = speed * np.where(far, -1., 1.)
+        pos = np.stack([np.where(side, far * width, along), np.where(side, along, far * height)], axis=-1)
+        velocity = np.stack([np.where(side, inward, drift), np.where(side, drift, inward)], axis=-1)
+        return pos.astype('float64'), velocity.astype('float64')
+
     def update(self):
-        self.accelerate()
-        self.pos += self.velocity
+        self.pos, self.velocity = self.drifted(self.pos, self.velocity, self.calculate_gravity(), self.drag)
         self.center_to_pos()
         self.kill_if_offscreen()
         self.kill_if_in_black_hole()
 
-    def accelerate(self):
-        gravity = self.calculate_gravity()
-        self.velocity = (self.velocity + gravity) * (1 - self.drag)
+    @staticmethod
+    def drifted(pos, velocity, gravity, drag):
+        # one step of update(): gravity, then drag, then move; (..., 2)
+        velocity = (velocity + gravity) * (1 - drag)
+        return pos + velocity, velocity
 
     def destroy(self, angle):
         if self.death_time is None:
-            self.image = pygame.transform.rotate(self.image_death.copy(), angle)
-            if self.game.sound_effects:
-                self.sound_death.play()
-            self.death_time = time.time()
+            self.image = self.game.rotation_cache.rotate(self.image_death, angle)
+            self.game.audio.play(self.sound_death, 'deaths')
+            self.death_time = self.game.clock.now
 
 
 class BlackHole(RWSprite):
-    raw_image = pygame.image.load('assets/black_hole.png').convert()
+    raw_image = atlas.image('black_hole', alpha=False)
     speed = 0.5
+    MAX_ENLARGE_SIZE = 200
+    ENLARGE_STEP = 3
+    MIN_PATH_RADIUS = 50
+    MAX_PATH_TURNS = 6  # path_arc is up to this many radii long
 
     def __init__(self, pos, game, size=None):
-        self.direction = random.randrange(0, 7)
+        self.direction = game.rng.randrange(0, 7)
         self.pos = pos
         super().__init__(self.pos, self.velocity, game)
         self.image = self.raw_image.copy()
         self.size = size
         if size is not None:
-            self.image = pygame.transform.scale(self.image, (size, size))
+            self.image = self.game.scale_cache.scale(self.raw_image, (size, size))
         self.rect = self.image.get_rect()
         self.center_to_pos()
         self.path_radius, self.path_arc = self.random_arc()
@@ -169,7 +1094,12 @@ class BlackHole(RWSprite):
 
     @property
     def velocity(self):
-        return self.speed * np.array([math.cos(self.direction), math.sin(self.direction)])
+        return self.velocities(self.direction)
+
+    @classmethod
+    def velocities(cls, direction):
+        # scalar or (N,) direction -> (..., 2)
+        return cls.speed * np.stack([np.cos(direction), np.sin(direction)], axis=-1)
 
     def update(self):
         self.next_direction()
@@ -178,21 +1108,35 @@ class BlackHole(RWSprite):
         self.center_to_pos()
 
     def random_arc(self):
-        path_radius = random.randint(50, self.game.screen_shape[1] / 2)
-        path_arc = random.randrange(1, 7) * random.choice([-1, 1]) * path_radius
+        path_radius = self.game.rng.randint(self.MIN_PATH_RADIUS, self.game.screen_shape[1] / 2)
+        path_arc = self.game.rng.randrange(1, self.MAX_PATH_TURNS + 1) * self.game.rng.choice([-1, 1]) * path_radius
         return path_radius, path_arc
 
     def next_direction(self):
-        if self.arc_traversed >= abs(self.path_arc):
+        if self.arc_done(self.arc_traversed, self.path_arc):
             self.path_radius, self.path_arc = self.random_arc()
             self.arc_traversed = 0
-        self.arc_traversed += self.speed
-        self.direction += 1.0 * self.speed / np.copysign(self.path_radius,  self.path_arc)
+        self.direction, self.arc_traversed = self.turned(self.direction, self.path_radius, self.path_arc, self.arc_traversed)
+
+    @staticmethod
+    def arc_done(arc_traversed, path_arc):
+        return arc_traversed >= np.abs(path_arc)
+
+    @classmethod
+    def turned(cls, direction, path_radius, path_arc, arc_traversed):
+        # one step along the arc: (direction, arc_traversed) after it; scalars or arrays
+        return direction + 1.0 * cls.speed / np.copysign(path_radius, path_arc), arc_traversed + cls.speed
 
     def enlarge(self):
-        if self.size <= 200:
-            self.size += 3
-            self.image = pygame.transform.scale(self.raw_image.copy(), (self.size, self.size))
+        size = self.enlarged(self.size)
+        if size != self.size:
+            self.size = int(size)
+            self.image = self.game.scale_cache.scale(self.raw_image, (self.size, self.size))
+
+    @classmethod
+    def enlarged(cls, size):
+        # size after increase_drone_spawn grows the hole, up to a little past MAX_ENLARGE_SIZE; scalar or array
+        return np.where(size <= cls.MAX_ENLARGE_SIZE, size + cls.ENLARGE_STEP, size)
 
 
 class Fighter(RWSprite):
@@ -205,30 +1149,34 @@ class Fighter(RWSprite):
                   'up': {'angle': math.radians(270)},
                   'upright': {'angle': math.radians(315)}}
     for direction in directions.keys():
-        directions[direction]['image'] = pygame.image.load(f'assets/fighter_{direction}.png').convert_alpha()
-        directions[direction]['image_shielded'] = pygame.image.load(f'assets/fighter_{direction}_shielded.png').convert_alpha()
-    torpedo_sound = pygame.mixer.Sound('assets/torpedo.wav')
+        directions[direction]['vector'] = np.array([math.cos(directions[direction]['angle']), math.sin(directions[direction]['angle'])])
+        directions[direction]['image'] = atlas.image(f'fighter_{direction}')
+        directions[direction]['image_shielded'] = atlas.image(f'fighter_{direction}_shielded')
+    torpedo_sound = LazySound('torpedo.wav')
 
-    death_image = pygame.image.load('assets/fighter-death.png')
-    death_sound = pygame.mixer.Sound('assets/fighter-death.wav')
+    death_image = atlas.image('fighter-death')
+    death_sound = LazySound('fighter-death.wav')
     death_time = None
+    death_duration = 1
 
     reset_time = None
     reset_duration = 2
     reset_active = True
     reset_alpha = 0
     reset_alpha_vel = -10
+    reset_alpha_levels = range(0, 181, 10)  # every value the blink in draw() passes through
+    faded_images = {}  # image -> {alpha: faded copy}, built with the first Fighter for the 16 direction images
 
     shields = False
-    shield_up_sound = pygame.mixer.Sound('assets/shield-up.wav')
-    shield_down_sound = pygame.mixer.Sound('assets/shield-down.wav')
+    shield_up_sound = LazySound('shield-up.wav')
+    shield_down_sound = LazySound('shield-down.wav')
 
     boost_acceleration = 3
     boost_duration = 0.25
-    boost_last_used = 0
+    boost_last_used = -math.inf
     boost_cooldown = 10
     boost_active = False
-    boost_sound = pygame.mixer.Sound('assets/boost.wav')
+    boost_sound = LazySound('boost.wav')
 
     zerog_torpedos = True
     zerog_clipsize = 20
@@ -245,35 +1193,38 @@ class Fighter(RWSprite):
 
     def __init__(self, game):
         super().__init__(self.pos, self.velocity, game)
+        for direction in self.directions.values():
+            for key in ('image', 'image_shielded'):
+                if direction[key] not in self.faded_images:
+                    self.faded_images[direction[key]] = fade_variants(direction[key], self.reset_alpha_levels)
 
     @property
     def boost_available(self):
-        return time.time() - self.boost_last_used > self.boost_cooldown
+        return self.game.clock.now - self.boost_last_used > self.boost_cooldown
 
     def boost(self):
         if self.boost_available:
             self.boost_active = True
-            self.boost_last_used = time.time()
-            if self.game.sound_effects:
-                self.boost_sound.play()
+            self.boost_last_used = self.game.clock.now
+            self.game.audio.play(self.boost_sound, 'powerups')
 
     def update_direction(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_w] and keys[pygame.K_d]:
+        keys = self.game.controls
+        if keys[Controls.W] and keys[Controls.D]:
             self.direction = 'upright'
-        elif keys[pygame.K_d] and keys[pygame.K_s]:
+        elif keys[Controls.D] and keys[Controls.S]:
             self.direction = 'downright'
-        elif keys[pygame.K_s] and keys[pygame.K_a]:
+        elif keys[Controls.S] and keys[Controls.A]:
             self.direction = 'downleft'
-        elif keys[pygame.K_a] and keys[pygame.K_w]:
+        elif keys[Controls.A] and keys[Controls.W]:
             self.direction = 'upleft'
-        elif keys[pygame.K_w]:
+        elif keys[Controls.W]:
             self.direction = 'up'
-        elif keys[pygame.K_d]:
+        elif keys[Controls.D]:
             self.direction = 'right'
-        elif keys[pygame.K_s]:
+        elif keys[Controls.S]:
             self.direction = 'down'
-        elif keys[pygame.K_a]:
+        elif keys[Controls.A]:
             self.direction = 'left'
 
     def move(self):
@@ -283,30 +1234,30 @@ class Fighter(RWSprite):
     def accelerate(self):
         gravity = self.calculate_gravity()
         accel = self.boost_acceleration if self.boost_active else self.acceleration
-        if self.death_time is None:
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_w] or keys[pygame.K_a] or keys[pygame.K_s] or keys[pygame.K_d]:
-                angle = self.directions[self.direction]['angle']
-                self.velocity = np.array([math.cos(angle) * accel + self.velocity[0],
-                                math.sin(angle) * accel + self.velocity[1]])
-        self.velocity = (self.velocity + gravity) * (1 - self.drag)
+        keys = self.game.controls
+        thrusting = self.death_time is None and (keys[Controls.W] or keys[Controls.A] or keys[Controls.S] or keys[Controls.D])
+        self.velocity = self.thrusted(self.velocity, gravity, self.directions[self.direction]['vector'], accel if thrusting else 0)
+
+    @classmethod
+    def thrusted(cls, velocity, gravity, heading, acceleration):
+        # accelerate(): acceleration along the unit vector heading (0 when not thrusting), then gravity and drag;
+        # velocity, gravity, heading: (..., 2), acceleration: scalar or (...,)
+        return (velocity + heading * np.asarray(acceleration)[..., np.newaxis] + gravity) * (1 - cls.drag)
 
     def get_powerup(self, powerup):
         if powerup.power == 'shield' and self.shields == False:
             self.shields = True
-            if self.game.sound_effects:
-                self.shield_up_sound.play()
+            self.game.audio.play(self.shield_up_sound, 'powerups')
         if powerup.power == 'zerog_torpedo':
             self.zerog_torpedos = True
             self.zerog_fired = 0
-            if self.game.sound_effects:
-                self.shield_up_sound.play()
+            self.game.audio.play(self.shield_up_sound, 'powerups')
             self.game.crosshair.set_skin('zerog')
         powerup.kill()
 
     def update(self):
         if self.death_time:
-            if time.time() > self.death_time + 1:
+            if self.game.clock.now > self.death_time + self.death_duration:
                 self.reset()
         else:
             self.update_direction()
@@ -316,10 +1267,10 @@ class Fighter(RWSprite):
                 self.image = self.directions[self.direction]['image']
 
         # update boost
-        if self.boost_active and time.time() - self.boost_last_used > self.boost_duration:
+        if self.boost_active and self.game.clock.now - self.boost_last_used > self.boost_duration:
             self.boost_active = False
         # update reset
-        if self.reset_active and time.time() - self.reset_time > self.reset_duration:
+        if self.reset_active and self.game.clock.now - self.reset_time > self.reset_duration:
             self.reset_active = False
             self.reset_alpha, self.reset_alpha_vel = 0, -10
         self.accelerate()
@@ -330,23 +1281,27 @@ class Fighter(RWSprite):
             if not (0 < self.reset_alpha < 180):
                 self.reset_alpha_vel *= -1
             self.reset_alpha += self.reset_alpha_vel
-            # self.reset_alpha = 128
-            blit_alpha(screen, self, self.reset_alpha)
+            variants = self.faded_images[self.image]  # reset() and update() only set direction images while it blinks
+            image = variants.get(self.reset_alpha) or variants[min(variants, key=lambda alpha: abs(alpha - self.reset_alpha))]
+            return screen.blit(image, self.rect)
         else:
-            screen.blit(self.image, self.rect)
+            return screen.blit(self.image, self.rect)
 
     def reset(self):
         self.direction = 'right'
         self.velocity = np.array([0., 0.])
         self.pos = self.initial_pos
+        self.image = self.directions[self.direction]['image_shielded' if self.shields else 'image']  # not the death image
+        self.rect = self.image.get_rect()
         self.center_to_pos()
+        self.prev_center = None  # drawn straight at the start, not slid there
         self.death_time = None
-        self.reset_time = time.time()
+        self.reset_time = self.game.clock.now
         self.reset_active = True
 
     def fire(self):
         if self.death_time is None:
-            rel_pos = np.array(pygame.mouse.get_pos()) - self.pos
+            rel_pos = np.array(self.game.controls.mouse) - self.pos
             angle = self.get_angle_from_vector(rel_pos)
             if self.zerog_torpedos:
                 skin = 'zerog'
@@ -356,37 +1311,34 @@ class Fighter(RWSprite):
                     self.game.crosshair.set_skin(None)
             else:
                 skin = None
-            self.game.torpedo_group.add(Torpedo(self.pos, angle, self.game, skin=skin))
-            if self.game.sound_effects:
-                self.torpedo_sound.play()
+            self.game.torpedo_group.fire(self.pos, angle, skin=skin)
+            self.game.audio.play(self.torpedo_sound, 'weapons')
 
     def destroy(self, angle):
         if self.shields == True:
             self.shields = False
-            if self.game.sound_effects:
-                self.shield_down_sound.play()
+            self.game.audio.play(self.shield_down_sound, 'powerups')
         elif self.death_time is None:
-            self.image = pygame.transform.rotate(self.death_image.copy(), angle)
-            if self.game.sound_effects:
-                self.death_sound.play()
-            self.death_time = time.time()
+            self.image = self.game.rotation_cache.rotate(self.death_image, angle)
+            self.game.audio.play(self.death_sound, 'deaths')
+            self.death_time = self.game.clock.now
 
 
 class Crosshair(pygame.sprite.Sprite):
-    raw_image = pygame.image.load('assets/crosshair.png').convert_alpha()
+    raw_image = atlas.image('crosshair')
     image = raw_image.copy()
     rect = image.get_rect()
     skin_names = ('zerog', )
-    skins = {skin: pygame.image.load(f'assets/crosshair-{skin}.png').convert_alpha() for skin in skin_names}
+    skins = {skin: atlas.image(f'crosshair-{skin}') for skin in skin_names}
 
     def __init__(self):
         super().__init__()
 
-    def update(self):
-        self.rect.center = pygame.mouse.get_pos()
+    def update(self, pos):
+        self.rect.center = pos
 
     def draw(self, screen):
-        screen.blit(self.image, self.rect)
+        return screen.blit(self.image, self.rect)
 
     def set_skin(self, skin):
         if skin is None:
@@ -395,48 +1347,212 @@ class Crosshair(pygame.sprite.Sprite):
             self.image = self.skins.get(skin).copy()
 
 
-class Torpedo(RWSprite):
-    raw_image = pygame.image.load('assets/torpedo.png').convert_alpha()
+class Torpedo:
+    raw_image = atlas.image('torpedo')
     skin_names = ('zerog', )
-    skins = {skin: pygame.image.load(f'assets/torpedo_{skin}.png').convert_alpha() for skin in skin_names}
-
-    def __init__(self, pos, angle, game, speed=20, skin=None):
-        self.skin = skin
-        if skin is not None:
-            self.raw_image = self.skins.get(skin).copy()
-        if skin == 'zerog':
-            speed = 40
-        self.image = self.raw_image.copy()
-        
-        self.speed = speed
-        self.pos = pos
-        self.velocity = self.get_unit_vector_from_angle(angle) * self.speed
-        
-        super().__init__(self.pos, self.velocity, game)
-        self.angle = angle
-        self.image = pygame.transform.rotate(self.image, math.degrees(self.angle))
-        self.rect = self.image.get_rect()
-        self.center_to_pos()
+    skins = {skin: atlas.image(f'torpedo_{skin}') for skin in skin_names}
+    speed = 20
+    skin_speeds = {'zerog': 40}
+    gravity_free_skins = ('zerog', )
+
+
+class Projectiles:
+    # structure-of-arrays store for every torpedo in the game, one row per slot
+    OWNER_FIGHTER = 0
+    OWNER_ENEMY = 1
+    skins = (None, ) + Torpedo.skin_names
+    images = (Torpedo.raw_image, ) + tuple(Torpedo.skins[skin] for skin in Torpedo.skin_names)
+    gravity_free = np.array([skin in Torpedo.gravity_free_skins for skin in skins])
+
+    def __init__(self, game, capacity=1024):
+        self.game = game
+        self.capacity = 0
+        self.pos = np.zeros((0, 2))
+        self.prev_pos = np.zeros((0, 2))  # pos before the last update, collisions sweep from here to pos
+        self.velocity = np.zeros((0, 2))
+        self.angle = np.zeros(0)
+        self.bucket = np.zeros(0, dtype='int64')  # rotation cache bucket of angle, kept alongside it
+        self.skin = np.zeros(0, dtype='int8')
+        self.owner = np.zeros(0, dtype='int8')
+        self.size = np.zeros((0, 2), dtype='int64')  # rect size, fixed at launch like Torpedo.rect
+        self.serial = np.zeros(0, dtype='int64')  # launch order, stands in for sprite group order
+        self.alive = np.zeros(0, dtype=bool)
+        self.free_slots = []
+        self.next_serial = 0
+        self.launched = []  # slots launched since the last SpatialHash.rebuild
+        self.rotations = [game.rotation_cache.full_table(image) for image in self.images]
+        for surfaces in self.rotations:
+            for surface in surfaces:
+                # thousands of small, mostly transparent blits a frame: run-length encoding skips the clear pixels
+                surface.set_alpha(255, pygame.RLEACCEL)
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        extra = capacity - self.capacity
+        self.pos = np.concatenate([self.pos, np.zeros((extra, 2))])
+        self.prev_pos = np.concatenate([self.prev_pos, np.zeros((extra, 2))])
+        self.velocity = np.concatenate([self.velocity, np.zeros((extra, 2))])
+        self.angle = np.concatenate([self.angle, np.zeros(extra)])
+        self.bucket = np.concatenate([self.bucket, np.zeros(extra, dtype='int64')])
+        self.skin = np.concatenate([self.skin, np.zeros(extra, dtype='int8')])
+        self.owner = np.concatenate([self.owner, np.zeros(extra, dtype='int8')])
+        self.size = np.concatenate([self.size, np.zeros((extra, 2), dtype='int64')])
+        self.serial = np.concatenate([self.serial, np.zeros(extra, dtype='int64')])
+        self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+        # pop() hands out the lowest free slot first
+        self.free_slots = list(range(capacity - 1, self.capacity - 1, -1)) + self.free_slots
+        self.capacity = capacity
+
+    def launch(self, pos, angles, owner, speed=None, skin=None):
+        angles = np.atleast_1d(np.asarray(angles, dtype='float64'))
+        num_new = len(angles)
+        if speed is None or skin in Torpedo.skin_speeds:
+            speed = Torpedo.skin_speeds.get(skin, Torpedo.speed)
+        while len(self.free_slots) < num_new:
+            self.grow(self.capacity * 2)
+        slots = np.array([self.free_slots.pop() for _ in range(num_new)], dtype='int64')
+        skin_index = self.skins.index(skin)
+        self.pos[slots] = pos
+        self.prev_pos[slots] = pos
+        self.velocity[slots] = RWSprite.get_unit_vectors_from_angles(angles) * speed
+        self.skin[slots] = skin_index
+        self.owner[slots] = owner
+        buckets = self.game.rotation_cache.buckets_of(np.degrees(angles))
+        self.size[slots] = [surface.get_size() for surface in self.rotations[skin_index][buckets]]
+        self.game.rotation_cache.hits += num_new  # looked up in the prebuilt tables, past RotationCache.rotate
+        # the heading as update() would work it out from the velocity, which gravity free torpedoes then keep
+        self.set_angle(slots, RWSprite.get_angles_from_vectors(self.velocity[slots]))
+        self.serial[slots] = np.arange(self.next_serial, self.next_serial + num_new)
+        self.next_serial += num_new
+        self.alive[slots] = True
+        self.launched.extend(slots.tolist())
+        return slots
+
+    def kill(self, slots):
+        slots = slots[self.alive[slots]]
+        self.alive[slots] = False
+        self.free_slots.extend(slots.tolist())
+
+    def set_angle(self, slots, angles):
+        self.angle[slots] = angles
+        self.bucket[slots] = self.game.rotation_cache.buckets_of(np.degrees(angles))
+
+    def select(self, owner=None):
+        mask = self.alive if owner is None else self.alive & (self.owner == owner)
+        return np.flatnonzero(mask)
+
+    def rects(self, slots, pos=None):
+        # same as Torpedo.center_to_pos: rect of the launch size centred on the truncated position
+        size = self.size[slots]
+        topleft = RWSprite.centred_topleft(self.pos[slots] if pos is None else pos, size)
+        return topleft[:, 0], topleft[:, 1], size[:, 0], size[:, 1]
 
     def update(self):
-        if self.skin == 'zerog':
-            gravity = np.array([0., 0.])
-        else:
-            gravity = self.calculate_gravity()
-        self.velocity += gravity
+        live = self.select()
+        if not live.size:
+            return
+        affected = live[~self.gravity_free[self.skin[live]]]
+        if affected.size:
+            self.velocity[affected] += self.game.gravity_engine.calculate(self.pos[affected])
+            # only gravity turns a torpedo
+            self.set_angle(affected, RWSprite.get_angles_from_vectors(self.velocity[affected]))
+        # every row moves, live or not: whole-array steps beat gathering the live slots, and launch resets the rest
+        self.prev_pos[:] = self.pos
         self.pos += self.velocity
-        self.center_to_pos()
-        self.angle = self.get_angle_from_vector(self.velocity)
-        self.image = pygame.transform.rotate(self.raw_image.copy(), math.degrees(self.angle))
-        self.kill_if_offscreen()
-        self.kill_if_in_black_hole()
+
+        self.kill(live[~RWSprite.on_screen(self.pos[live], self.game.screen_shape)])
+
+    def collide(self, rect, owner, dokill):
+        # like pygame.sprite.spritecollide: angles of the hits in launch order
+        return self.collide_all([rect], owner, dokill)[0]
+
+    def collide_all(self, rects, owner, dokill):
+        # collide against each rect in turn, in one batch: with dokill a torpedo only counts for the first rect it hits,
+        # as the rects after it would no longer see it. owner None takes every torpedo
+        slots, targets = self.game.spatial_hash.projectile_candidates(rects)
+        keep = self.alive[slots] if owner is None else self.alive[slots] & (self.owner[slots] == owner)
+        slots, targets = slots[keep], targets[keep]
+        if not len(slots):
+            return [slots[:0].astype('float64')] * len(rects)
+        bounds = np.array([(rect.left, rect.top, rect.width, rect.height) for rect in rects], dtype='int64').reshape(-1, 4)[targets]
+        hit = self.hits(slots, bounds[:, :2], bounds[:, 2:])
+        slots, targets = slots[hit], targets[hit]
+        if dokill:
+            order = np.lexsort((targets, slots))
+            slots, targets = slots[order], targets[order]
+            first = np.diff(slots, prepend=-1) != 0
+            slots, targets = slots[first], targets[first]
+        order = np.lexsort((self.serial[slots], targets))
+        slots, targets = slots[order], targets[order]
+        angles = self.angle[slots].copy()
+        if dokill:
+            self.kill(slots)
+        return np.split(angles, np.searchsorted(targets, np.arange(1, len(rects))))
+
+    def hits(self, slots, topleft, size):
+        return self.touches(self.pos[slots], self.prev_pos[slots], self.size[slots], topleft, size)
+
+    @staticmethod
+    def touches(pos, prev_pos, size, topleft, target_size):
+        # rects_collide at the current position, or the rect swept from prev_pos to pos crossing the target on the way,
+        # so fast torpedoes can't step over anything smaller than a frame's travel. (..., 2) arrays, broadcast together
+        pos, prev_pos, size, topleft, target_size = np.broadcast_arrays(pos, prev_pos, size, topleft, target_size)
+        now = RWSprite.rects_collide(RWSprite.centred_topleft(pos, size), size, topleft, target_size)
+        # only pairs whose swept bounding box reaches the target need the exact sweep
+        maybe = (~now & (np.minimum(prev_pos, pos) - size / 2 < topleft + target_size).all(axis=-1)
+                 & (np.maximum(prev_pos, pos) + size / 2 > topleft).all(axis=-1))
+        now[maybe] = RWSprite.sweeps_collide(prev_pos[maybe], pos[maybe], size[maybe], topleft[maybe], target_size[maybe])
+        return now
+
+    def draw(self, screen, owner, doreturn=False, alpha=1.):
+        # alpha: how far between the previous and the current tick's positions to draw
+        rects = []
+        slots = self.select(owner)
+        pos = None if alpha == 1 else self.prev_pos[slots] + alpha * (self.pos[slots] - self.prev_pos[slots])
+        left, top, _, _ = self.rects(slots, pos)
+        skins = self.skin[slots]
+        buckets = self.bucket[slots]
+        self.game.rotation_cache.hits += len(slots)
+        for skin, rotations in enumerate(self.rotations):
+            of_skin = skins == skin
+            if of_skin.any():
+                surfaces = rotations[buckets[of_skin]].tolist()
+                drawn = screen.blits(zip(surfaces, zip(left[of_skin].tolist(), top[of_skin].tolist())), doreturn=doreturn)
+                if doreturn:
+                    rects += drawn
+        return rects
+
+
+class ProjectileGroup:
+    # sprite-group style view onto one owner's rows of the Projectiles store
+    def __init__(self, projectiles, owner):
+        self.projectiles = projectiles
+        self.owner = owner
+
+    def __len__(self):
+        return len(self.projectiles.select(self.owner))
+
+    def fire(self, pos, angles, speed=None, skin=None):
+        return self.projectiles.launch(pos, angles, self.owner, speed=speed, skin=skin)
+
+    def collide(self, rect, dokill):
+        return self.projectiles.collide(rect, self.owner, dokill)
+
+    def collide_all(self, rects, dokill):
+        return self.projectiles.collide_all(rects, self.owner, dokill)
+
+    def draw(self, screen, doreturn=False, alpha=1.):
+        return self.projectiles.draw(screen, self.owner, doreturn, alpha)
+
+    def empty(self):
+        self.projectiles.kill(self.projectiles.select(self.owner))
 
 
 class EnemyFighter(DroneBase):
-    raw_image = pygame.image.load('assets/fighter_red_right.png').convert_alpha()
+    raw_image = atlas.image('fighter_red_right')
     image = raw_image.copy()
-    image_death = pygame.image.load('assets/fighter-death.png')
-    sound_death = pygame.mixer.Sound('assets/fighter-death.wav')
+    image_death = atlas.image('fighter-death')
+    sound_death = LazySound('fighter-death.wav')
     speed = 1
     max_acceleration = 1
     acceleration = max_acceleration
@@ -448,8 +1564,8 @@ class EnemyFighter(DroneBase):
     intra_volley_wait = 0.2
     volley_shots_fired = volley_size
 
-    death_image = pygame.image.load('assets/fighter-death.png')
-    death_sound = pygame.mixer.Sound('assets/fighter-death.wav')
+    death_image = atlas.image('fighter-death')
+    death_sound = LazySound('fighter-death.wav')
     # shot_taken_image = pygame.image.load('assets/enemy-fighter-shot-taken.png')
     # shot_taken_sound = pygame.mixer.Sound('assets/shot_taken.wav')
     death_time = None
@@ -462,72 +1578,96 @@ class EnemyFighter(DroneBase):
 
     def __init__(self, game):
         super().__init__(game)
-        self.last_fired_time = time.time()
-
-    def set_direction(self, gravity):
-        unit_gravity = gravity / self.hypotenuse(gravity)
-        velocity_max_escape = self.velocity + gravity - unit_gravity * self.acceleration
-        angle_gravity = self.get_angle_from_vector(gravity)
+        self.last_fired_time = self.game.clock.now
+
+    steering = None  # (gravity, direction, acceleration, volley) set by EnemyFighter.steer_all once per frame
+    torpedo_hit = None  # angle of the first torpedo to hit it this frame, set by update_game
+    HOLD_FIRE, START_VOLLEY, CONTINUE_VOLLEY = 0, 1, 2
+
+    @classmethod
+    def steer_all(cls, enemy_fighters, target):
+        enemy_fighters = list(enemy_fighters)
+        if not enemy_fighters:
+            return
+        now = enemy_fighters[0].game.clock.now
+        gravity = np.array([enemy_fighter.calculate_gravity() for enemy_fighter in enemy_fighters], dtype='float64')
+        pos = np.array([enemy_fighter.pos for enemy_fighter in enemy_fighters], dtype='float64')
+        velocity = np.array([enemy_fighter.velocity for enemy_fighter in enemy_fighters], dtype='float64')
+        state = np.array([(enemy_fighter.direction, enemy_fighter.acceleration, now - enemy_fighter.last_fired_time,
+                           enemy_fighter.volley_shots_fired) for enemy_fighter in enemy_fighters], dtype='float64')
+        direction, acceleration = cls.steer(pos, velocity, gravity, state[:, 0], state[:, 1], np.asarray(target, dtype='float64'))
+        volley = cls.volleys(pos, target, state[:, 2], state[:, 3])
+        for i, enemy_fighter in enumerate(enemy_fighters):
+            enemy_fighter.steering = gravity[i], float(direction[i]), float(acceleration[i]), int(volley[i])
+
+    @classmethod
+    def steer(cls, pos, velocity, gravity, direction, acceleration, target):
+        # (N, 2) arrays -> new (N,) direction and acceleration: escape the black hole, hold, slow down or pursue target
+        magnitude_gravity = np.sqrt(gravity[:, 0]**2 + gravity[:, 1]**2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            unit_gravity = gravity / magnitude_gravity[:, np.newaxis]
+        velocity_max_escape = velocity + gravity - unit_gravity * acceleration[:, np.newaxis]
+        angle_gravity = cls.get_angles_from_vectors(gravity)
         theta = angle_gravity + math.pi
-        speed_max_escape = np.absolute(velocity_max_escape * np.array([math.cos(theta), math.sin(theta)])).sum()
-        magnitude_gravity = self.hypotenuse(gravity)
-        self.acceleration = self.max_acceleration
-        dist_from_fighter = self.hypotenuse(self.pos - self.game.fighter.pos)
-        # if speed_max_escape < magnitude_gravity:
-        #     # fly into black hole
-        #     self.direction = angle_gravity
-        if speed_max_escape < magnitude_gravity:
-            # fly away from black hole
-            self.direction = angle_gravity + math.pi
-        elif dist_from_fighter < self.hold_dist:
-            # hold position
-            self.acceleration = 0
-        elif dist_from_fighter < self.proximity_dist:
-            # slow down
-            self.acceleration = self.max_acceleration / (self.proximity_dist - self.hold_dist) * (dist_from_fighter - self.hold_dist)
-        else:
-            # fly to fighter
-            rel_pos = self.game.fighter.pos - self.pos
-            self.direction = self.get_angle_from_vector(rel_pos)
+        speed_max_escape = np.absolute(velocity_max_escape * np.stack([np.cos(theta), np.sin(theta)], axis=1)).sum(axis=1)
+        rel_pos = target - pos
+        dist_from_fighter = np.sqrt(rel_pos[:, 0]**2 + rel_pos[:, 1]**2)
+
+        escape = speed_max_escape < magnitude_gravity  # NaN for zero gravity, never escapes
+        hold = ~escape & (dist_from_fighter < cls.hold_dist)
+        slow = ~escape & ~hold & (dist_from_fighter < cls.proximity_dist)
+        pursue = ~(escape | hold | slow)
+        direction = np.where(escape, angle_gravity + math.pi, np.where(pursue, cls.get_angles_from_vectors(rel_pos), direction))
+        slowed = cls.max_acceleration / (cls.proximity_dist - cls.hold_dist) * (dist_from_fighter - cls.hold_dist)
+        acceleration = np.where(hold, 0., np.where(slow, slowed, cls.max_acceleration))
+        return direction, acceleration
+
+    @classmethod
+    def volleys(cls, pos, target, time_since_last_fire, volley_shots_fired):
+        # (N,) START_VOLLEY when within hold_dist and reloaded, CONTINUE_VOLLEY for the next shot of one, else HOLD_FIRE
+        rel_pos = pos - target
+        dist_from_fighter = np.sqrt(rel_pos[:, 0]**2 + rel_pos[:, 1]**2)
+        start = (dist_from_fighter < cls.hold_dist) & (time_since_last_fire > cls.fire_refresh)
+        resume = (volley_shots_fired < cls.volley_size) & (time_since_last_fire > cls.intra_volley_wait * volley_shots_fired)
+        return np.where(start, cls.START_VOLLEY, np.where(resume, cls.CONTINUE_VOLLEY, cls.HOLD_FIRE))
 
     def calculate_gravity(self):
         return super().calculate_gravity() * 0.7
 
     def update(self):
-        gravity = self.calculate_gravity()
-        self.set_direction(gravity)
+        if self.steering is None:
+            self.steer_all([self], self.game.fighter.pos)
+        (gravity, self.direction, self.acceleration, volley), self.steering = self.steering, None
 
         if self.death_time is None:
-            torpedo_collisions = pygame.sprite.spritecollide(self, self.game.torpedo_group, True)
-            if torpedo_collisions:
-                self.take_fire(torpedo_collisions[0].angle)
+            if self.torpedo_hit is not None:
+                self.take_fire(self.torpedo_hit)
+                self.torpedo_hit = None
             else:
-                self.image = pygame.transform.rotate(self.raw_image.copy(), math.degrees(self.direction))
+                self.image = self.game.rotation_cache.rotate(self.raw_image, math.degrees(self.direction))
             self.image.get_rect()
-            self.fire_volley()
+            self.fire_volley(volley)
 
             self.velocity += self.get_unit_vector_from_angle(self.direction) * self.acceleration
-        elif time.time() - self.death_time > 3:
+        elif self.game.clock.now - self.death_time > 3:
             self.kill()
         self.velocity = (self.velocity + gravity) * (1 - self.drag)
         self.pos += self.velocity
         self.center_to_pos()
         self.limit_pos_to_screen()
 
-    def fire_volley(self):
-        time_since_last_fire = time.time() - self.last_fired_time
-        dist_from_fighter = self.hypotenuse(self.pos - self.game.fighter.pos)
-        if dist_from_fighter < self.hold_dist and time_since_last_fire > self.fire_refresh:
+    def fire_volley(self, volley):
+        if volley == self.START_VOLLEY:
             self.fire()
-            self.last_fired_time = time.time()
+            self.last_fired_time = self.game.clock.now
             self.volley_shots_fired = 1
-        elif self.volley_shots_fired < self.volley_size and time_since_last_fire > self.intra_volley_wait * self.volley_shots_fired:
+        elif volley == self.CONTINUE_VOLLEY:
             self.volley_shots_fired += 1
             self.fire()
 
     def fire(self):
         angle = self.get_angle_from_vector(self.game.fighter.pos - self.pos)
-        self.game.enemy_torpedo_group.add(Torpedo(self.pos.copy(), angle, self.game))
+        self.game.enemy_torpedo_group.fire(self.pos, angle)
 
     def take_fire(self, angle):
         if self.death_time is None:
@@ -539,42 +1679,53 @@ class EnemyFighter(DroneBase):
                 pass
 
     def destroy(self, angle):
-        self.death_time = time.time()
+        self.death_time = self.game.clock.now
         self.game.score += self.max_hp
-        self.image = pygame.transform.rotate(self.death_image.copy(), math.degrees(angle))
+        self.image = self.game.rotation_cache.rotate(self.death_image, math.degrees(angle))
 
 
 class Drone(DroneBase):
-    sound_death = pygame.mixer.Sound('assets/drone-death.wav')
-    image = pygame.image.load('assets/drone.png').convert_alpha()
-    image_death = pygame.image.load('assets/drone-death.png').convert_alpha()
+    sound_death = LazySound('drone-death.wav')
+    image = atlas.image('drone')
+    image_death = atlas.image('drone-death')
     speed = 8
+    fire_interval = 1.5
+    death_duration = 0.5
+    volley_angles = np.arange(0, 7) * math.pi / 4
+    torpedo_speed = 10
 
     def __init__(self, game):
         super().__init__(game)
 
     def update(self):
         super().update()
-        if time.time() > self.init_time + 10:
+        expired, fire, gone = self.lifecycle(self.game.clock.now, self.init_time, self.last_fired_time,
+                                             np.nan if self.death_time is None else self.death_time)
+        if expired or gone:
             self.kill()
-        elif time.time() > self.last_fired_time + 1.5 and self.death_time is None:
+        elif fire:
             self.fire()
-        elif self.death_time:
-            if time.time() > self.death_time + 0.5:
-                self.kill()
+
+    @classmethod
+    def lifecycle(cls, now, init_time, last_fired_time, death_time):
+        # (expired, fire, gone) for update(), death_time NaN while alive: past its lifetime, due a volley while
+        # alive, or dead for death_duration. Scalars or arrays
+        expired = now > init_time + cls.lifetime
+        alive = np.isnan(death_time)
+        fire = ~expired & alive & (now > last_fired_time + cls.fire_interval)
+        gone = ~expired & ~alive & (now > death_time + cls.death_duration)
+        return expired, fire, gone
 
     def fire(self):
-        for angle in np.arange(0, 7) * math.pi / 4:
-            self.game.enemy_torpedo_group.add(Torpedo(self.pos.copy(), angle, self.game, speed=10))
-        if self.game.sound_effects:
-            self.torpedo_sound.play()
-        self.last_fired_time = time.time()
+        self.game.enemy_torpedo_group.fire(self.pos, self.volley_angles, speed=self.torpedo_speed)
+        self.game.audio.play(self.torpedo_sound, 'weapons')
+        self.last_fired_time = self.game.clock.now
 
 
 class Powerup(DroneBase):
     images = {
-        'shield': pygame.image.load('assets/shield_orb.png').convert_alpha(),
-        'zerog_torpedo': pygame.image.load('assets/zerog_torpedo_orb.png').convert_alpha(),
+        'shield': atlas.image('shield_orb'),
+        'zerog_torpedo': atlas.image('zerog_torpedo_orb'),
     }
     speed = 6
 
@@ -586,22 +1737,10 @@ class Powerup(DroneBase):
 
     def update(self):
         super().update()
-        if time.time() > self.init_time + 10:
+        if self.game.clock.now > self.init_time + self.lifetime:
             self.kill()
 
 
-class Star:
-    def __init__(self, pos, color, radius):
-        self.pos = pos
-        self.color = color
-        self.radius = radius
-
-    def draw(self, screen):
-        posint = tuple(map(int, self.pos))
-        # print(self.pos, posint)
-        pygame.draw.circle(screen, self.color, posint, self.radius)
-
-
 class Stars:
     colors = ((x, x, x) for x in (80, 120, 145, 180, 225))
     star_options = tuple(zip((1, 1, 2, 2, 3), (colors)))
@@ -609,52 +1748,401 @@ class Stars:
     num_stars = 500
     velocity = np.array([-.2, .1])
 
-    def __init__(self, screen_shape):
+    def __init__(self, screen_shape, num_stars=None, layers=1, seed=None):
+        # stars live in arrays: position, star option (radius/color) and parallax speed factor
         self.screen_shape = screen_shape
+        if num_stars is not None:
+            self.num_stars = num_stars
+        self.layer_speeds = np.linspace(1, 0.3, layers) if layers > 1 else np.ones(1)
+        self.rng = np.random.default_rng(random.getrandbits(32) if seed is None else seed)
+        self.probabilities = np.array(self.weights) / sum(self.weights)
+        self.stamps = [self.make_stamp(radius, color) for radius, color in self.star_options]
+        # pixel offsets from the star centre that each stamp covers
+        self.footprints = [np.argwhere(pygame.surfarray.array2d(stamp) != stamp.map_rgb((0, 0, 0))) - radius
+                           for stamp, (radius, _) in zip(self.stamps, self.star_options)]
+        self.previous_centers = None
         self.init_stars()
 
+    @staticmethod
+    def make_stamp(radius, color):
+        # what pygame.draw.circle(screen, color, center, radius) paints, centred at (radius, radius)
+        stamp = pygame.Surface((2 * radius + 1, 2 * radius + 1)).convert()
+        stamp.set_colorkey((0, 0, 0))
+        pygame.draw.circle(stamp, color, (radius, radius), radius)
+        return stamp
+
     def update(self):
-        num_new = 0
-        for i in reversed(range(len(self.stars))):
-            star = self.stars[i]
-            # offset stars
-            star.pos += self.velocity
-            # delete stars off-screen
-            if not (0 < star.pos[0] < self.screen_shape[0] and 0 < star.pos[1] < self.screen_shape[1]):
-                del self.stars[i]
-                num_new += 1
-        # gen stars
-        self.new_stars(num_new)
-
-    def new_stars(self, num_new):
-        star_params = random.choices(self.star_options, weights=self.weights, k=num_new)
-
-        axis_weights = tuple(map(abs, self.velocity))
-        axes = random.choices(('x', 'y'), weights=axis_weights, k=num_new)
-
-        for (radius, color), axis in zip(star_params, axes):
-            if axis == 'x':
-                pos = np.array([
-                    random.random() * self.screen_shape[0],
-                    0 if self.velocity[1] > 0 else self.screen_shape[1]
-                ])
-            else:
-                pos = np.array([
-                    0 if self.velocity[0] > 0 else self.screen_shape[0],
-                    random.random() * self.screen_shape[1]
-                ])
-            self.stars.append(Star(pos, color, radius))
+        self.pos += self.velocity * self.speeds[:, np.newaxis]
+        # respawn stars that left the screen
+        offscreen = ~((0 < self.pos[:, 0]) & (self.pos[:, 0] < self.screen_shape[0])
+                      & (0 < self.pos[:, 1]) & (self.pos[:, 1] < self.screen_shape[1]))
+        num_new = np.count_nonzero(offscreen)
+        if num_new:
+            self.pos[offscreen] = self.new_positions(num_new)
+            self.options[offscreen] = self.rng.choice(len(self.star_options), size=num_new, p=self.probabilities)
+
+    def new_positions(self, num_new):
+        axis_weights = np.abs(self.velocity)
+        through_top_or_bottom = self.rng.random(num_new) < axis_weights[0] / axis_weights.sum()
+        pos = np.empty((num_new, 2))
+        # entering through the top/bottom edge
+        pos[:, 0] = self.rng.random(num_new) * self.screen_shape[0]
+        pos[:, 1] = 0 if self.velocity[1] > 0 else self.screen_shape[1]
+        # entering through the left/right edge
+        side = ~through_top_or_bottom
+        pos[side, 0] = 0 if self.velocity[0] > 0 else self.screen_shape[0]
+        pos[side, 1] = self.rng.random(np.count_nonzero(side)) * self.screen_shape[1]
+        return pos
 
     def draw(self, screen):
-        for star in self.stars:
-            star.draw(screen)
+        # writes every star's pixels straight into the screen through a surfarray view
+        try:
+            pixels = pygame.surfarray.pixels2d(screen)
+        except ValueError:  # no 2d view of 24-bit surfaces
+            self.draw_stamps(screen)
+            return
+        centers = np.trunc(self.pos).astype('int64')
+        width, height = pixels.shape
+        for option, (_, color) in enumerate(self.star_options):
+            points = (centers[self.options == option][:, np.newaxis, :] + self.footprints[option]).reshape(-1, 2)
+            inside = (points[:, 0] >= 0) & (points[:, 0] < width) & (points[:, 1] >= 0) & (points[:, 1] < height)
+            pixels[points[inside, 0], points[inside, 1]] = screen.map_rgb(color)
+        del pixels  # unlocks the screen
+
+    def changed_rects(self):
+        # old and new rects of every star whose pixel position changed since the last call
+        centers = np.trunc(self.pos).astype('int64')
+        previous, self.previous_centers = self.previous_centers, centers
+        if previous is None:
+            return [pygame.Rect((0, 0), self.screen_shape)]
+        changed = np.any(centers != previous, axis=1)
+        radius = max(radius for radius, _ in self.star_options)
+        corners = np.concatenate([previous[changed], centers[changed]]) - radius
+        return [pygame.Rect(x, y, 2 * radius + 1, 2 * radius + 1) for x, y in corners.tolist()]
+
+    def draw_stamps(self, screen):
+        topleft = np.trunc(self.pos).astype('int64')
+        for option, (radius, _) in enumerate(self.star_options):
+            coords = (topleft[self.options == option] - radius).tolist()
+            screen.blits(zip(itertools.repeat(self.stamps[option]), coords), doreturn=False)
 
     def init_stars(self):
-        self.stars = []
-        star_params = random.choices(self.star_options, weights=self.weights, k=self.num_stars)
-        for radius, color in star_params:            
-            pos = (random.randint(0, self.screen_shape[0]), random.randint(0, self.screen_shape[1]))
-            self.stars.append(Star(pos, color, radius))
+        self.options = self.rng.choice(len(self.star_options), size=self.num_stars, p=self.probabilities)
+        self.pos = np.stack([self.rng.integers(0, self.screen_shape[0], self.num_stars, endpoint=True),
+                             self.rng.integers(0, self.screen_shape[1], self.num_stars, endpoint=True)], axis=1).astype('float64')
+        self.speeds = self.layer_speeds[self.rng.integers(0, len(self.layer_speeds), self.num_stars)]
+
+
+class SpatialHash:
+    # uniform grid broadphase; update_game reindexes each layer as soon as its sprites have moved, so every
+    # query sees what the sprite groups' own checks saw. Every candidate is confirmed with the same colliderect test
+    def __init__(self, game, cell_size=128):
+        self.game = game
+        self.cell_size = cell_size
+        self.rows = self.game.screen_shape[1] // cell_size + 1
+        self.cols = self.game.screen_shape[0] // cell_size + 1
+        self.sprite_layers = {}
+        self.projectile_slots = np.zeros(0, dtype='int64')
+        self.projectile_cells = np.zeros(0, dtype='int64')
+        self.projectile_reach = 0
+
+    def rebuild(self):
+        self.index_sprites('black_holes', self.game.black_hole_group)
+        self.index_sprites('powerups', self.game.powerup_group)
+        self.index_projectiles()
+
+    def cells_for_rect(self, rect):
+        for col in range(rect.left // self.cell_size, (rect.right - 1) // self.cell_size + 1):
+            for row in range(rect.top // self.cell_size, (rect.bottom - 1) // self.cell_size + 1):
+                yield col, row
+
+    def index_sprites(self, layer, group):
+        cells = {}
+        for order, sprite in enumerate(group):
+            for cell in self.cells_for_rect(sprite.rect):
+                cells.setdefault(cell, []).append((order, sprite))
+        self.sprite_layers[layer] = (group, cells, set(group))
+
+    def sprites_colliding(self, rect, layer):
+        # like pygame.sprite.spritecollide(sprite, group, False), in group order
+        group, cells, indexed = self.sprite_layers[layer]
+        found = {}
+        for cell in self.cells_for_rect(rect):
+            for order, sprite in cells.get(cell, ()):
+                found[sprite] = order
+        candidates = sorted(found, key=found.get)
+        candidates += [sprite for sprite in group if sprite not in indexed]
+        return [sprite for sprite in candidates if sprite in group and rect.colliderect(sprite.rect)]
+
+    def index_projectiles(self):
+        projectiles = self.game.projectiles
+        slots = projectiles.select()
+        cells = self.projectile_cells_of(slots)
+        order = np.argsort(cells, kind='stable')
+        self.projectile_slots = slots[order]
+        self.projectile_cells = cells[order]
+        self.projectile_reach = self.reach_of(slots)
+        projectiles.launched = []
+
+    def projectile_cells_of(self, slots):
+        centers = np.trunc(self.game.projectiles.pos[slots]).astype('int64') // self.cell_size
+        return np.clip(centers[:, 0], 0, self.cols - 1) * self.rows + np.clip(centers[:, 1], 0, self.rows - 1)
+
+    def reach_of(self, slots):
+        # a rect reaches at most half its size plus a pixel of truncation past its centre's cell, and collisions sweep
+        # back to prev_pos, so widen by the furthest step as well
+        projectiles = self.game.projectiles
+        if not len(slots):
+            return 0
+        steps = np.abs(projectiles.pos[slots] - projectiles.prev_pos[slots])
+        return int((projectiles.size[slots].max() + 1) // 2 + 1 + np.ceil(steps.max()))
+
+    def cell_ranges(self, bounds, reach):
+        # first/last column and row of the cells a (left, top, right, bottom) rect widened by reach touches
+        cell_size = self.cell_size
+        return (np.maximum((bounds[:, 0] - reach) // cell_size, 0), np.minimum((bounds[:, 2] + reach) // cell_size, self.cols - 1),
+                np.maximum((bounds[:, 1] - reach) // cell_size, 0), np.minimum((bounds[:, 3] + reach) // cell_size, self.rows - 1))
+
+    def projectile_candidates(self, rects):
+        # (slots, targets): for each rect in turn, the slots whose rect may touch it, all in one batch. Indexed by
+        # centre cell, so each rect is widened by the largest reach and looks up a run of rows in each of its columns
+        bounds = np.array([(rect.left, rect.top, rect.right, rect.bottom) for rect in rects], dtype='int64').reshape(-1, 4)
+        first_col, last_col, first_row, last_row = self.cell_ranges(bounds, self.projectile_reach)
+        num_cols = np.maximum(last_col - first_col + 1, 0)
+        column_rect = np.repeat(np.arange(len(bounds)), num_cols)
+        cols = first_col[column_rect] + np.arange(len(column_rect)) - np.repeat(np.cumsum(num_cols) - num_cols, num_cols)
+        starts = np.searchsorted(self.projectile_cells, cols * self.rows + first_row[column_rect], side='left')
+        ends = np.searchsorted(self.projectile_cells, cols * self.rows + last_row[column_rect], side='right')
+        lengths = np.maximum(ends - starts, 0)
+        runs = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        slots, targets = self.projectile_slots[runs], np.repeat(column_rect, lengths)
+        if self.game.projectiles.launched and len(bounds):
+            # not indexed yet, so matched against the rects' cells directly; a reused slot may also still sit in the
+            # index under its old cell
+            launched = np.unique(np.array(self.game.projectiles.launched, dtype='int64'))
+            stale = launched[np.minimum(np.searchsorted(launched, slots), len(launched) - 1)] == slots
+            cells = self.projectile_cells_of(launched)
+            col, row = (cells // self.rows)[:, np.newaxis], (cells % self.rows)[:, np.newaxis]
+            first_col, last_col, first_row, last_row = self.cell_ranges(bounds, self.reach_of(launched))
+            launched_index, launched_targets = np.nonzero((first_col <= col) & (col <= last_col) & (first_row <= row) & (row <= last_row))
+            slots = np.concatenate([slots[~stale], launched[launched_index]])
+            targets = np.concatenate([targets[~stale], launched_targets])
+        return slots, targets
+
+    def black_hole_collisions(self):
+        # torpedoes only: drones and powerups check for themselves in DroneBase.update
+        self.game.projectiles.collide_all([black_hole.rect for black_hole in self.game.black_hole_group], None, True)
+
+
+class FrameProfiler:
+    # per-stage frame times and entity counts over a rolling window of frames;
+    # every method returns straight away while the profiler is disabled
+    def __init__(self, window=600, enabled=False):
+        self.window = window
+        self.enabled = enabled
+        self.show_overlay = False
+        self.stages = {}  # stage name -> column
+        self.counters = {}  # group name -> column
+        self.timings = np.zeros((window, 0))
+        self.counts = np.zeros((window, 0), dtype='int64')
+        self.frames = 0
+        self.row = 0
+        self.last_time = 0.
+        self.font = None
+
+    def column(self, columns, name, attribute):
+        if name not in columns:
+            columns[name] = len(columns)
+            table = getattr(self, attribute)
+            setattr(self, attribute, np.concatenate([table, np.zeros((self.window, 1), dtype=table.dtype)], axis=1))
+        return columns[name]
+
+    def start_frame(self):
+        if not self.enabled:
+            return
+        self.row = self.frames % self.window
+        self.frames += 1
+        self.timings[self.row] = 0
+        self.counts[self.row] = 0
+        self.last_time = time.perf_counter()
+
+    def lap(self, stage):
+        # charges the time since the previous lap to stage
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        column = self.column(self.stages, stage, 'timings')
+        self.timings[self.row, column] += now - self.last_time
+        self.last_time = now
+
+    def count(self, name, value):
+        if not self.enabled:
+            return
+        column = self.column(self.counters, name, 'counts')
+        self.counts[self.row, column] = value
+
+    def recent(self):
+        # rows in the window, oldest first
+        if self.frames <= self.window:
+            return self.timings[:self.frames], self.counts[:self.frames]
+        order = np.roll(np.arange(self.window), -(self.frames % self.window))
+        return self.timings[order], self.counts[order]
+
+    def summary(self):
+        timings, counts = self.recent()
+        timings = timings * 1000
+        summary = {'frames': min(self.frames, self.window), 'stages_ms': {}, 'counts': {}}
+        for stage, column in self.stages.items():
+            summary['stages_ms'][stage] = {'mean': float(timings[:, column].mean()),
+                                           'p95': float(np.percentile(timings[:, column], 95)),
+                                           'max': float(timings[:, column].max())}
+        for name, column in self.counters.items():
+            summary['counts'][name] = {'mean': float(counts[:, column].mean()), 'max': int(counts[:, column].max())}
+        return summary
+
+    def dump(self, path):
+        timings, counts = self.recent()
+        first_frame = self.frames - len(timings)
+        header = ['frame'] + [f'{stage}_ms' for stage in self.stages] + list(self.counters)
+        rows = [[first_frame + i] + (timings[i] * 1000).tolist() + counts[i].tolist() for i in range(len(timings))]
+        with open(path, 'w', newline='') as f:
+            if path.endswith('.csv'):
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+            else:
+                f.write(json.dumps({'summary': self.summary(),
+                                    'columns': header,
+                                    'frames': rows}))
+
+    def draw(self, screen):
+        if not (self.enabled and self.show_overlay and self.frames):
+            return
+        if self.font is None:
+            self.font = assets.font('Aller_Rg.ttf', 16)
+        summary = self.summary()
+        lines = [f"frame {sum(stage['mean'] for stage in summary['stages_ms'].values()):6.2f} ms"]
+        lines += [f"{stage:<22}{stats['mean']:6.2f} ms  max {stats['max']:6.2f}" for stage, stats in summary['stages_ms'].items()]
+        lines += [f"{name:<22}{stats['mean']:8.0f}" for name, stats in summary['counts'].items()]
+        rects = [screen.blit(self.font.render(line, True, (120, 220, 120)), (10, 10 + 18 * i)) for i, line in enumerate(lines)]
+        return rects[0].unionall(rects[1:])
+
+
+class DirtyRects:
+    # rects drawn this frame and last frame; updating both covers every pixel that changed
+    def __init__(self, screen_shape, threshold=0.4):
+        self.screen_area = screen_shape[0] * screen_shape[1]
+        self.threshold = threshold  # fraction of the screen above which a full flip is cheaper
+        self.current = []
+        self.previous = []
+        self.full_redraw = True
+        self.dirty_area = 0
+        self.present_time = 0.
+        self.full_flips = 0
+        self.partial_updates = 0
+
+    def add(self, rect):
+        self.current.append(rect)
+
+    def extend(self, rects):
+        self.current.extend(rects)
+
+    def invalidate(self):
+        # the next present() flips the whole screen (e.g. after a menu or transition frame)
+        self.full_redraw = True
+        self.current = []
+
+    def present(self):
+        rects = self.previous + self.current
+        self.dirty_area = sum(rect.width * rect.height for rect in rects)  # overlaps counted twice
+        start = time.perf_counter()
+        if self.full_redraw or self.dirty_area > self.threshold * self.screen_area:
+            pygame.display.flip()
+            self.full_flips += 1
+        else:
+            pygame.display.update(rects)
+            self.partial_updates += 1
+        self.present_time = time.perf_counter() - start
+        self.previous, self.current = self.current, []
+        self.full_redraw = False
+
+
+class HUD:
+    # score, lives, level, countdown, boost bar and zero-g rounds, each cached as a rendered
+    # surface and re-rendered only when the value it shows changes
+    def __init__(self, game):
+        self.game = game
+        self.elements = {}  # name -> (value, surface, rect)
+        self.text_renders = 0
+        self.frame_text_renders = 0
+        self.text_renders_per_second = 0.
+        self.window_start = time.perf_counter()
+        self.window_renders = 0
+
+    def element(self, name, value, render):
+        cached = self.elements.get(name)
+        if cached is None or cached[0] != value:
+            cached = self.elements[name] = (value, *render())
+        return cached[1], cached[2]
+
+    def text(self, font, text, color, **position):
+        self.text_renders += 1
+        surface = font.render(text, True, color)
+        return surface, surface.get_rect(**position)
+
+    def boost_bar(self, width, color):
+        background, foreground = self.game.boost_bar_layers
+        surface = background.copy()
+        pygame.draw.rect(surface, color, pygame.Rect(158, 11, width, 20))
+        surface.blit(foreground, (0, 0))
+        return surface, surface.get_rect(topleft=self.game.boost_bar_pos)
+
+    def zerog_rounds(self, rounds):
+        image = Torpedo.raw_image
+        # rounds sit in two rows of ten, right to left, the second row 15px higher
+        surface = pygame.Surface((9 * 30 + image.get_width(), 15 + image.get_height()), pygame.SRCALPHA)
+        for i in range(rounds):
+            if i < 10:
+                surface.blit(image, ((9 - i) * 30, 15))
+            else:
+                surface.blit(image, ((9 - (i - 10)) * 30, 0))
+        x = self.game.screen_shape[0] - 35 - 9 * 30
+        y = self.game.screen_shape[1] - 70 - 15
+        return surface, surface.get_rect(topleft=(x, y))
+
+    def draw(self, screen):
+        game = self.game
+        renders = self.text_renders
+        width = game.screen_shape[0]
+
+        next_level_secs = game.game_params.nextlevel_freq / 1000 - (game.clock.now - game.level_start_time)
+        countdown = f'Next Level {math.floor(next_level_secs / 60)}:{int(next_level_secs % 60):02d}'
+        boost_progress = (game.clock.now - game.fighter.boost_last_used) / game.fighter.boost_cooldown
+        if boost_progress >= 1:
+            boost_color = (53, 172, 240)
+            boost_progress = 1
+        else:
+            boost_color = (86, 138, 168)
+        boost_width = int(boost_progress * 130)
+
+        elements = [
+            self.element('score', game.score, lambda: self.text(game.game_font, f'Score: {game.score}', (200, 200, 200), center=(int(width / 2), 30))),
+            self.element('lives', game.lives, lambda: self.text(game.game_font, f'Lives: {game.lives}', (170, 170, 170), center=(int(width / 2), 80))),
+            self.element('level', game.level, lambda: self.text(game.game_font, f'Level {game.level}', (170, 170, 170), center=(width - 240, 30))),
+            self.element('countdown', countdown, lambda: self.text(game.game_font_small, countdown, (170, 170, 170), center=(width - 202, 80))),
+            self.element('boost', (boost_width, boost_color), lambda: self.boost_bar(boost_width, boost_color)),
+        ]
+        if game.fighter.zerog_torpedos:
+            rounds = game.fighter.zerog_clipsize - game.fighter.zerog_fired
+            elements.append(self.element('zerog_rounds', rounds, lambda: self.zerog_rounds(rounds)))
+        rects = [screen.blit(surface, rect) for surface, rect in elements]
+
+        self.frame_text_renders = self.text_renders - renders
+        now = time.perf_counter()
+        if now - self.window_start >= 1:
+            self.text_renders_per_second = (self.text_renders - self.window_renders) / (now - self.window_start)
+            self.window_start, self.window_renders = now, self.text_renders
+        return rects
 
 
 #------------- GAME CLASS -----------------
@@ -667,7 +2155,12 @@ class GameParams:
     powerupspawn_freq = 10000
     nextlevel_freq = 1 * 60 * 1000
     enemyfighterspawn_freq = 40 * 1000
-    
+    gravity_mode = GravityEngine.EXACT  # BARNES_HUT for levels with many black holes, GRID for many entities
+    gravity_cutoff = 400  # px, black holes further away are ignored in CUTOFF mode; see GravityEngine.cutoff_error
+    gravity_theta = 0.5  # BARNES_HUT opening threshold: node size / distance
+    gravity_grid_spacing = 16  # px between GRID samples
+    gravity_grid_tolerance = 2  # px a black hole drifts from its GRID samples; 2 keeps the error under ~0.4, 8 under ~1.1
+
     def __init__(self, level):
         self.level = level
         self.black_holes += 1 if self.level > 2 else 0
@@ -677,9 +2170,22 @@ class GameParams:
         self.enemyfighterspawn_freq = int(self.enemyfighterspawn_freq * 0.8**(level - 1))
         self.lives += 2 * (level - 1)
 
+    def ramped_dronespawn_freq(self, dronespawn_freq):
+        # the drone spawn interval after one increase_drone_spawn; 0 stops spawning. Scalar or array
+        return np.maximum(0, dronespawn_freq - self.dronespawn_freq_ramp)
+
+    def black_hole_sizes(self):
+        # every size setup_game can deal (total split by weights in [1, 2)) and BlackHole.enlarge can ramp to
+        others = self.black_holes - 1
+        smallest = int(self.black_hole_total_size / (1 + 2 * others))
+        largest = int(self.black_hole_total_size * 2 / (2 + others))
+        return range(max(smallest, 1), max(largest, BlackHole.MAX_ENLARGE_SIZE + BlackHole.ENLARGE_STEP) + 1)
+
 
 class RelativityWars:
-    fps = 60
+    fps = 60  # simulation ticks per second
+    max_fps = 240  # drawn frames per second in play(), 0 for no cap; drawing interpolates between ticks
+    max_ticks_per_frame = 5
     fpsClock = pygame.time.Clock()
 
     score = 0
@@ -688,46 +2194,57 @@ class RelativityWars:
 
     sound_effects = True
 
-    game_font = pygame.font.Font('assets/Aller_Rg.ttf', 32)
-    game_font_small = pygame.font.Font('assets/Aller_Rg.ttf', 26)
+    game_font = LazyFont('Aller_Rg.ttf', 32)
+    game_font_small = LazyFont('Aller_Rg.ttf', 26)
 
-    game_over_sound = pygame.mixer.Sound('assets/game-over.wav')
-    game_over_10plus = pygame.mixer.Sound('assets/game-over-10plus.wav')
-    game_over_20plus = pygame.mixer.Sound('assets/game-over-20plus.wav')
-    game_over_50plus = pygame.mixer.Sound('assets/game-over-50plus.wav')
+    game_over_sound = LazySound('game-over.wav')
+    game_over_10plus = LazySound('game-over-10plus.wav')
+    game_over_20plus = LazySound('game-over-20plus.wav')
+    game_over_50plus = LazySound('game-over-50plus.wav')
 
-    checkmark = pygame.image.load('assets/checkmark.png')
+    checkmark = atlas.image('checkmark')
 
-    start_screen = pygame.image.load('assets/start-screen.png').convert()
-    next_level_images = [pygame.image.load(f'assets/next_level_{i + 1}.png').convert_alpha() for i in range(3)]
-    boost_bar_layers =  [pygame.image.load('assets/boost-bar-background.png').convert_alpha(),
-                         pygame.image.load('assets/boost-bar-foreground.png').convert_alpha()]
+    start_screen = atlas.image('start-screen', alpha=False)
+    next_level_images = [atlas.image(f'next_level_{i + 1}') for i in range(3)]
+    boost_bar_layers =  [atlas.image('boost-bar-background'),
+                         atlas.image('boost-bar-foreground')]
 
     black_hole_group = pygame.sprite.Group()
-    torpedo_group = pygame.sprite.Group()
-    enemy_torpedo_group = pygame.sprite.Group()
     powerup_group = pygame.sprite.Group()
     enemy_fighter_group = pygame.sprite.Group()
 
     pygame.mouse.set_visible(False)
     crosshair = Crosshair()
 
-    DRONESPAWN = pygame.USEREVENT
-    INCREASEDRONESPAWN = pygame.USEREVENT + 1
-    POWERUPSPAWN = pygame.USEREVENT + 2
-    NEXTLEVEL = pygame.USEREVENT + 3
-    ENEMYFIGHTERSPAWN = pygame.USEREVENT + 4
+    INCREASEDRONESPAWN_FREQ = 3000
     next_level_transition = True
-    next_level_image_scale = 0.1
+    next_level_image_start_scale = 0.1
+    next_level_image_scale = next_level_image_start_scale
+    next_level_image_scale_step = 0.1
+    next_level_image_dims = (350, 172)
+    scale_cache = ScaleCache()  # shared by every game in the process, sources are class-level images
     next_level_transition_start_time = 0
     level_start_time = 0
     drone_group = pygame.sprite.Group()
 
-    game_active = False
-    pygame.mixer.music.load('assets/game-music.wav')
-    pygame.mixer.music.set_volume(0.3)
+    num_stars = Stars.num_stars
+    star_layers = 1
 
-    def __init__(self, level=1, fighter=None, screen=screen, screen_shape=screen_shape):
+    game_active = False
+    render = True
+    dirty_rect_rendering = False
+    profile_path = None
+    startup_probe = False  # report the first flips on stdout and exit, see startup_benchmark.py
+    controls = Controls()
+    recorder = None
+    music_loaded = not HEADLESS
+    if music_loaded:
+        pygame.mixer.music.load('assets/game-music.wav')
+        pygame.mixer.music.set_volume(0.3)
+
+    def __init__(self, level=1, fighter=None, screen=screen, screen_shape=screen_shape, rotation_buckets=360, profiler=None, seed=None):
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)  # every gameplay random draw, so a seed and the inputs replay a session
         self.screen_shape = screen_shape
         self.screen = screen
         self.screen_width, self.screen_height = self.screen_shape
@@ -738,6 +2255,20 @@ class RelativityWars:
         self.boost_bar_pos = (self.screen_shape[0] - 320, self.screen_shape[1] - 50)
 
         self.get_level(level)
+        self.clock = GameClock(tick_length=1 / self.fps)
+        self.scheduler = Scheduler(self.clock)
+        self.profiler = profiler or FrameProfiler()
+        self.dirty_rects = DirtyRects(self.screen_shape) if self.dirty_rect_rendering else None
+        self.hud = HUD(self)
+        self.audio = AudioManager(self)
+        self.gravity_engine = GravityEngine(self)
+        self.rotation_cache = RotationCache(rotation_buckets)
+        for image in Projectiles.images:
+            self.rotation_cache.prebuild(image)
+        self.projectiles = Projectiles(self)
+        self.torpedo_group = ProjectileGroup(self.projectiles, Projectiles.OWNER_FIGHTER)
+        self.enemy_torpedo_group = ProjectileGroup(self.projectiles, Projectiles.OWNER_ENEMY)
+        self.spatial_hash = SpatialHash(self)
 
         if isinstance(fighter, Fighter):
             self.fighter = fighter
@@ -747,13 +2278,34 @@ class RelativityWars:
     def get_level(self, level):
         self.level = level
         self.game_params = GameParams(level)
+        self.prewarm_scales()
+
+    def prewarm_scales(self):
+        # black hole sizes and banner zoom steps this level can show, so neither stalls a frame later
+        self.scale_cache.prewarm(BlackHole.raw_image, ((size, size) for size in self.game_params.black_hole_sizes()))
+        self.scale_cache.prewarm(self.next_level_image(), self.next_level_zoom_dims())
+
+    def next_level_image(self):
+        try:
+            return self.next_level_images[self.level - 1]
+        except IndexError:
+            return self.next_level_images[-1]
+
+    def next_level_zoom_dims(self):
+        # replays the per-frame float accumulation in next_level_transition_loop
+        scale, steps = self.next_level_image_start_scale, []
+        while True:
+            steps.append(tuple(int(scale * d) for d in self.next_level_image_dims))
+            if scale > 1:
+                return steps
+            scale += self.next_level_image_scale_step
 
     def next_level(self):
         self.game_params = GameParams(self.level + 1)
         self.level += 1
 
     def setup_game(self):
-        self.stars = Stars(self.screen_shape)
+        self.stars = Stars(self.screen_shape, self.num_stars, self.star_layers, seed=self.rng.getrandbits(32))
         self.dronespawn_freq = self.game_params.dronespawn_freq
         self.powerupspawn_freq = self.game_params.powerupspawn_freq
         self.black_hole_group.empty()
@@ -765,72 +2317,70 @@ class RelativityWars:
         self.enemy_fighter_group.empty()
         
         # black hole generation
-        rand = np.array([random.random() + 1 for _ in range(self.game_params.black_holes)])
+        rand = np.array([self.rng.random() + 1 for _ in range(self.game_params.black_holes)])
         sizes = self.game_params.black_hole_total_size / sum(rand) * rand
         sizes = [int(s) for s in sizes]
         for i in range(self.game_params.black_holes):
-            pos = np.array([random.randrange(200, self.screen_shape[0] - 200), random.randrange(200, self.screen_shape[1] - 200)])
+            pos = np.array([self.rng.randrange(200, self.screen_shape[0] - 200), self.rng.randrange(200, self.screen_shape[1] - 200)])
             black_hole = BlackHole(pos, self, size=sizes[i])
             self.black_hole_group.add(black_hole)
-
-        pygame.time.set_timer(self.DRONESPAWN, self.dronespawn_freq)
-        pygame.time.set_timer(self.INCREASEDRONESPAWN, 3000)
-        pygame.time.set_timer(self.POWERUPSPAWN, self.powerupspawn_freq)
-        pygame.time.set_timer(self.NEXTLEVEL, self.game_params.nextlevel_freq)
-        pygame.time.set_timer(self.ENEMYFIGHTERSPAWN, self.game_params.enemyfighterspawn_freq)
+        if (self.game_params.gravity_mode == GravityEngine.CUTOFF
+                and GravityEngine.cutoff_error(self.game_params.black_holes, self.game_params.gravity_cutoff) > GravityEngine.MAX_GRAVITY):
+            print(f'ignoring black holes past {self.game_params.gravity_cutoff} px can turn the pull around with '
+                  f'{self.game_params.black_holes} of them; using BARNES_HUT', file=sys.stderr)
+            self.game_params.gravity_mode = GravityEngine.BARNES_HUT
+
+        # timer frequencies are in ms, like the pygame.time.set_timer calls they replaced
+        self.scheduler.cancel_all()
+        self.drone_timer = None
+        self.schedule_drone_spawn()
+        self.scheduler.every(self.INCREASEDRONESPAWN_FREQ / 1000, self.increase_drone_spawn)
+        self.scheduler.every(self.powerupspawn_freq / 1000, self.spawn_powerup)
+        self.scheduler.schedule(self.game_params.nextlevel_freq / 1000, self.start_next_level)
+        self.scheduler.every(self.game_params.enemyfighterspawn_freq / 1000, self.spawn_enemy_fighter)
         self.fighter.reset()
-        self.level_start_time = time.time()
+        self.level_start_time = self.clock.now
         self.lives = self.game_params.lives
         self.fighter.shields = False
         self.fighter.zerog_torpedos = False
         self.fighter.zerog_fired = 0        
+        self.spatial_hash.rebuild()
 
-    def game_over(self):
-        self.high_score = max([self.score, self.high_score])
-        self.get_level(1)
+    def schedule_drone_spawn(self):
+        self.scheduler.cancel(self.drone_timer)
+        self.drone_timer = None
+        if self.dronespawn_freq > 0:  # set_timer treated 0 as "stop spawning"
+            self.drone_timer = self.scheduler.every(self.dronespawn_freq / 1000, self.spawn_drone)
 
-    def score_display(self):
-        score_surface = self.game_font.render(f'Score: {self.score}', True, (200, 200, 200))
-        score_rect = score_surface.get_rect(center=(int(self.screen_shape[0] / 2), 30))
-        self.screen.blit(score_surface, score_rect)
+    def spawn_drone(self):
+        self.drone_group.add(Drone(self))
 
-        lives_surface = self.game_font.render(f'Lives: {self.lives}', True, (170, 170, 170))
-        lives_rect = lives_surface.get_rect(center=(int(self.screen_shape[0] / 2), 80))
-        self.screen.blit(lives_surface, lives_rect)
+    def increase_drone_spawn(self):
+        self.dronespawn_freq = int(self.game_params.ramped_dronespawn_freq(self.dronespawn_freq))
+        self.schedule_drone_spawn()
+        for black_hole in self.black_hole_group:
+            black_hole.enlarge()
 
-        level_surface = self.game_font.render(f'Level {self.level}', True, (170, 170, 170))
-        level_rect = level_surface.get_rect(center=(self.screen_shape[0] - 240, 30))
-        self.screen.blit(level_surface, level_rect)
+    def spawn_powerup(self):
+        power = self.rng.choice(['shield', 'zerog_torpedo'])
+        self.powerup_group.add(Powerup(power, self))
 
-        next_level_secs = self.game_params.nextlevel_freq / 1000 - (time.time() - self.level_start_time)
-        level_time_surface = self.game_font_small.render(f'Next Level {math.floor(next_level_secs / 60)}:{int(next_level_secs % 60):02d}', True, (170, 170, 170))
-        level_time_rect = level_time_surface.get_rect(center=(self.screen_shape[0] - 202, 80))
-        self.screen.blit(level_time_surface, level_time_rect)
+    def spawn_enemy_fighter(self):
+        self.enemy_fighter_group.add(EnemyFighter(self))
 
-        self.screen.blit(self.boost_bar_layers[0], self.boost_bar_pos)
-        boost_progress = (time.time() - self.fighter.boost_last_used) / self.fighter.boost_cooldown
-        if boost_progress >= 1:
-            boost_color = (53, 172, 240)
-            boost_progress = 1
-        else:
-            boost_color =  (86, 138, 168)
-        boost_rect = pygame.Rect(self.boost_bar_pos[0] + 158,
-                                 self.boost_bar_pos[1] + 11,
-                                 int(boost_progress * 130),
-                                 20)
-        pygame.draw.rect(self.screen, boost_color, boost_rect)
-        self.screen.blit(self.boost_bar_layers[1], self.boost_bar_pos)
-
-        if self.fighter.zerog_torpedos:
-            rounds = self.fighter.zerog_clipsize - self.fighter.zerog_fired
-            x = self.screen_shape[0] - 35
-            y = self.screen_shape[1] - 70
-            t = pygame.transform.rotate(Torpedo.raw_image, math.pi / 4)
-            for i in range(rounds):
-                if i < 10:
-                    self.screen.blit(Torpedo.raw_image, (x - i * 30, y))
-                else:
-                    self.screen.blit(Torpedo.raw_image, (x - (i - 10) * 30, y - 15))
+    def start_next_level(self):
+        self.next_level_transition_start_time = self.clock.now
+        self.next_level_transition = True
+        self.get_level(self.level + 1)
+
+    def game_over(self):
+        self.high_score = max([self.score, self.high_score])
+        self.get_level(1)
+
+    def score_display(self):
+        rects = self.hud.draw(self.screen)
+        self.profiler.count('hud_text_renders', self.hud.frame_text_renders)
+        return rects
 
     def is_mouse_over_button(self, button):
         button_coords = {'play': ((98, 281), (230, 341)),
@@ -839,26 +2389,69 @@ class RelativityWars:
                         'effects': ((256, 385), (266, 396))}
         area = button_coords.get(button)
         area = tuple(np.array(point) + self.START_SCREEN_OFFSET for point in area)
-        pos = pygame.mouse.get_pos()
+        pos = self.controls.mouse
         return area[0][0] < pos[0] < area[1][0] and area[0][1] < pos[1] < area[1][1]
 
     def play(self):
         # pygame.mixer.music.play()
         self.setup_game()
-
+        self.clock.set_mode(GameClock.STEPPED)  # the timestep keeps the ticks in step with the wall clock
+        timestep = FixedTimestep(self.clock.tick_length, self.max_ticks_per_frame)
+        events = []
         while True:
-            events = pygame.event.get()
-            for event in events:
-                if event.type == pygame.QUIT:
-                    self.exit()
-            if not self.game_active:
-                self.start_screen_loop(events)
-            elif self.next_level_transition:
-                self.next_level_transition_loop()
-            elif self.game_active:
-                self.game_loop(events)
-            pygame.display.flip()
-            self.fpsClock.tick(self.fps)
+            events += pygame.event.get()
+            for _ in range(timestep.advance()):
+                self.tick(events)
+                events = []
+            self.present(timestep.alpha)
+            if self.startup_probe:
+                print('first_frame', flush=True)
+                self.exit()
+            self.fpsClock.tick(self.max_fps)
+
+    def frame(self, events, controls=None, now=None):
+        # one tick and its frame; replays pass the recorded controls and clock time instead of polling
+        self.tick(events, controls, now)
+        self.present()
+
+    def tick(self, events, controls=None, now=None):
+        # one fixed step of the simulation; the start screen and level transition draw as they go
+        self.profiler.start_frame()
+        if now is None:
+            self.clock.tick()
+        else:
+            self.clock.tick_to(now)
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.exit()
+        self.controls = controls = controls or Controls.read(events)
+        if not self.game_active:
+            self.start_screen_loop()
+            self.profiler.lap('start_screen')
+        elif self.next_level_transition:
+            self.next_level_transition_loop()
+            self.profiler.lap('next_level_transition')
+        elif self.game_active:
+            self.update_game(events, controls)
+        if self.recorder is not None:
+            self.recorder.write(self.clock.now, controls)
+
+    def present(self, alpha=1.):
+        # draws the game alpha of the way from the previous tick to the latest and shows it
+        in_game = self.game_active and not self.next_level_transition
+        if self.render:
+            if in_game:
+                self.draw_game(alpha)
+            if self.dirty_rects is not None and in_game:
+                self.dirty_rects.present()
+                self.profiler.count('dirty_area', self.dirty_rects.dirty_area)
+            else:
+                pygame.display.flip()
+                if self.dirty_rects is not None:
+                    self.dirty_rects.invalidate()
+        self.profiler.lap('display.flip')
+        self.audio.flush()
+        self.profiler.lap('audio')
 
     def load_vars(self):
         with open('vars.json', 'r') as f:
@@ -870,116 +2463,272 @@ class RelativityWars:
             f.write(json.dumps({'high_score': self.high_score}))
 
     def exit(self):
+        if self.profiler.enabled and self.profile_path:
+            self.profiler.dump(self.profile_path)
+        if self.recorder is not None:
+            self.recorder.close()
         self.write_vars()
         pygame.quit()
         sys.exit()
 
-    def game_loop(self, events):
+    def run_headless(self, ticks=None, seconds=None, clock_mode=GameClock.STEPPED, clock_speed=None):
+        # runs game_loop without drawing, sound or a frame cap; game over starts a new game
+        self.clock.set_mode(clock_mode, clock_speed)
+        self.render = False
+        self.sound_effects = False
+        self.game_active = True
+        self.next_level_transition = False
+        self.score = 0
+        self.setup_game()
+        self.gravity_engine.error_bound = 0.
+        games = 1
+        tick = 0
+        start = time.perf_counter()
+        while (ticks is None or tick < ticks) and (seconds is None or time.perf_counter() - start < seconds):
+            self.profiler.start_frame()
+            self.clock.tick()
+            self.game_loop(pygame.event.get())
+            tick += 1
+            if not self.game_active:
+                self.game_active = True
+                self.score = 0
+                games += 1
+                self.setup_game()
+            elif self.next_level_transition:
+                self.next_level_transition = False
+                self.setup_game()
+        elapsed = time.perf_counter() - start
+        if self.profiler.enabled and self.profile_path:
+            self.profiler.dump(self.profile_path)
+        return {'ticks': tick,
+                'seconds': elapsed,
+                'ticks_per_second': tick / elapsed if elapsed else 0,
+                'simulated_seconds': self.clock.now,
+                'games': games,
+                'level': self.level,
+                'score': self.score,
+                'gravity_error_bound': self.gravity_engine.error_bound}
+
+    def record(self, path):
+        self.recorder = ReplayRecorder(path, self.seed, self.screen_shape, self.level)
+
+    @classmethod
+    def from_replay(cls, replay, **kwargs):
+        screen = pygame.Surface(replay.screen_shape)
+        return cls(level=replay.level, screen=screen, screen_shape=replay.screen_shape, seed=replay.seed, **kwargs)
+
+    def run_replay(self, replay):
+        # the recorded ticks through the same play loop, undrawn and without a frame cap
+        self.render = False
+        self.setup_game()
+        start = time.perf_counter()
+        for index in range(len(replay.ticks)):
+            self.frame([], replay.controls(index), now=float(replay.ticks[index]['now']))
+        elapsed = time.perf_counter() - start
+        if self.profiler.enabled and self.profile_path:
+            self.profiler.dump(self.profile_path)
+        return {'ticks': len(replay.ticks),
+                'seconds': elapsed,
+                'ticks_per_second': len(replay.ticks) / elapsed if elapsed else 0,
+                'simulated_seconds': self.clock.now,
+                'level': self.level,
+                'score': self.score,
+                'state': self.state_digest()}
+
+    def state_digest(self):
+        # compact fingerprint of the simulation, equal between a session and its replay
+        state = [self.level, self.score, self.lives, self.fighter.pos.tolist(), self.fighter.velocity.tolist(),
+                 len(self.drone_group), len(self.enemy_fighter_group), len(self.torpedo_group), len(self.enemy_torpedo_group),
+                 [black_hole.pos.tolist() for black_hole in self.black_hole_group], self.rng.getstate()[1]]
+        return f'{zlib.crc32(json.dumps(state).encode()):08x}'
+
+    def game_loop(self, events, controls=None):
+        self.update_game(events, controls)
+        if self.render:
+            self.draw_game()
+
+    def update_game(self, events, controls=None):
+        # controls: this tick's input when it doesn't come from pygame (replays, bots)
+        self.controls = controls = controls or Controls.read(events)
         for event in events:
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    self.game_active = False
-                    self.game_over()
-                    break
-                elif event.key == pygame.K_r:
-                    self.fighter.reset()
-                elif event.key == pygame.K_LSHIFT:
-                    self.fighter.boost()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.profiler.show_overlay = not self.profiler.show_overlay
+                self.profiler.enabled = self.profiler.enabled or self.profiler.show_overlay
+        if controls[Controls.ESCAPE]:
+            self.game_active = False
+            self.game_over()
+        else:
+            if controls[Controls.R]:
+                self.fighter.reset()
+            if controls[Controls.SHIFT]:
+                self.fighter.boost()
+            for _ in range(controls.clicks):
                 self.fighter.fire()
-            elif event.type == self.DRONESPAWN:
-                self.drone_group.add(Drone(self))
-            elif event.type == self.INCREASEDRONESPAWN:
-                self.dronespawn_freq = max([0, self.dronespawn_freq - self.game_params.dronespawn_freq_ramp])
-                pygame.time.set_timer(self.DRONESPAWN, self.dronespawn_freq)
-                for black_hole in self.black_hole_group:
-                    black_hole.enlarge()
-            elif event.type == self.POWERUPSPAWN:
-                power = random.choice(['shield', 'zerog_torpedo'])
-                self.powerup_group.add(Powerup(power, self))
-            elif event.type == self.ENEMYFIGHTERSPAWN:
-                self.enemy_fighter_group.add(EnemyFighter(self))
-            elif event.type == self.NEXTLEVEL:
-                self.next_level_transition_start_time = time.time()
-                self.next_level_transition = True
-                self.get_level(self.level + 1)
-    
+        self.profiler.lap('events')
+        if self.game_active:
+            self.scheduler.run_due()
+        self.profiler.lap('scheduler')
+
         if not self.fighter.reset_active:
-            fighter_collisions = pygame.sprite.spritecollide(self.fighter, self.enemy_torpedo_group, True)
-            if fighter_collisions:
+            fighter_collisions = self.enemy_torpedo_group.collide(self.fighter.rect, True)
+            if len(fighter_collisions):
                 if not self.fighter.shields:
                     self.lives -= 1
                 if self.lives < 0:
-                    if self.sound_effects:
-                        if self.score >= 50:
-                            self.game_over_50plus.play()
-                        elif self.score >= 20:
-                            self.game_over_20plus.play()
-                        elif self.score >= 10:
-                            self.game_over_10plus.play()
-                        else:
-                            self.game_over_sound.play()
+                    if self.score >= 50:
+                        self.audio.play(self.game_over_50plus, 'ui')
+                    elif self.score >= 20:
+                        self.audio.play(self.game_over_20plus, 'ui')
+                    elif self.score >= 10:
+                        self.audio.play(self.game_over_10plus, 'ui')
+                    else:
+                        self.audio.play(self.game_over_sound, 'ui')
                     self.game_active = False
                     self.game_over()
                 else:
-                    self.fighter.destroy(fighter_collisions[0].angle)
+                    self.fighter.destroy(fighter_collisions[0])
 
-        hit_drones = pygame.sprite.groupcollide(self.drone_group, self.torpedo_group, False, True)
-        if hit_drones:
-            for drone, torpedos in hit_drones.items():
-                if drone.death_time is None:
-                    self.score += 1
-                    drone.destroy(torpedos[0].angle)
+        drones = self.drone_group.sprites()
+        for drone, torpedos in zip(drones, self.torpedo_group.collide_all([drone.rect for drone in drones], True)):
+            if len(torpedos) and drone.death_time is None:
+                self.score += 1
+                drone.destroy(torpedos[0])
 
-        powerup_collisions = pygame.sprite.spritecollide(self.fighter, self.powerup_group, False)
+        powerup_collisions = self.spatial_hash.sprites_colliding(self.fighter.rect, 'powerups')
         if powerup_collisions:
             for powerup in powerup_collisions:
                 self.fighter.get_powerup(powerup)
+        self.profiler.lap('collisions')
 
         # Update
-        self.fighter.update()
+        for sprite in self.interpolated_sprites():
+            sprite.prev_center = sprite.rect.center
+        self.fighter.update()  # pulled by the black holes before they move
+        self.profiler.lap('fighter.update')
         self.black_hole_group.update()
-        self.crosshair.update()
-        self.torpedo_group.update()
-        self.enemy_torpedo_group.update()
+        self.spatial_hash.index_sprites('black_holes', self.black_hole_group)
+        self.profiler.lap('black_holes.update')
+        self.gravity_engine.apply(self.gravity_affected_sprites())
+        self.profiler.lap('gravity')
+        self.crosshair.update(self.controls.mouse)
+        self.projectiles.update()
+        self.spatial_hash.index_projectiles()
+        self.spatial_hash.black_hole_collisions()
+        self.profiler.lap('projectiles.update')
         self.drone_group.update()
+        self.profiler.lap('drones.update')
         self.powerup_group.update()
+        self.spatial_hash.index_sprites('powerups', self.powerup_group)
         self.stars.update()
+        self.profiler.lap('stars.update')
+        # each enemy fighter is tested before it moves, against the torpedoes after theirs, as in its own update
+        enemy_fighters = [enemy_fighter for enemy_fighter in self.enemy_fighter_group if enemy_fighter.death_time is None]
+        for enemy_fighter, torpedo_collisions in zip(enemy_fighters, self.torpedo_group.collide_all([enemy_fighter.rect for enemy_fighter in enemy_fighters], True)):
+            if len(torpedo_collisions):
+                enemy_fighter.torpedo_hit = torpedo_collisions[0]
+        EnemyFighter.steer_all(self.enemy_fighter_group, self.fighter.pos)
         self.enemy_fighter_group.update()
-
-        # Draw
+        self.profiler.lap('enemy_fighters.update')
+        self.count_entities()
+
+    def count_entities(self):
+        if self.profiler.enabled:
+            self.profiler.count('torpedoes', len(self.torpedo_group))
+            self.profiler.count('enemy_torpedoes', len(self.enemy_torpedo_group))
+            self.profiler.count('drones', len(self.drone_group))
+            self.profiler.count('powerups', len(self.powerup_group))
+            self.profiler.count('enemy_fighters', len(self.enemy_fighter_group))
+            self.profiler.count('black_holes', len(self.black_hole_group))
+
+    def draw_game(self, alpha=1.):
+        # with dirty rect rendering every draw also records the rects it touched
+        moved = self.interpolate(alpha) if alpha < 1 else ()
+        dirty_rects = self.dirty_rects
+        tracking = dirty_rects is not None
         self.screen.fill((0, 0, 0))
         self.stars.draw(self.screen)
-        self.black_hole_group.draw(self.screen)
-        self.drone_group.draw(self.screen)
-        self.powerup_group.draw(self.screen)
-        self.fighter.draw(self.screen)
-        self.crosshair.draw(self.screen)
+        if tracking:
+            dirty_rects.extend(self.stars.changed_rects())
+        self.profiler.lap('stars.draw')
+        for group in (self.black_hole_group, self.drone_group, self.powerup_group):
+            group.draw(self.screen)
+            if tracking:
+                dirty_rects.extend(group.spritedict.values())
+        self.profiler.lap('sprites.draw')
+        fighter_rect = self.fighter.draw(self.screen)
+        crosshair_rect = self.crosshair.draw(self.screen)
         self.enemy_fighter_group.draw(self.screen)
-        self.torpedo_group.draw(self.screen)
-        self.enemy_torpedo_group.draw(self.screen)
-        self.score_display()
+        if tracking:
+            dirty_rects.extend((fighter_rect, crosshair_rect))
+            dirty_rects.extend(self.enemy_fighter_group.spritedict.values())
+        self.profiler.lap('fighters.draw')
+        torpedo_rects = self.torpedo_group.draw(self.screen, doreturn=tracking, alpha=alpha)
+        enemy_torpedo_rects = self.enemy_torpedo_group.draw(self.screen, doreturn=tracking, alpha=alpha)
+        if tracking:
+            dirty_rects.extend(torpedo_rects)
+            dirty_rects.extend(enemy_torpedo_rects)
+        self.profiler.lap('projectiles.draw')
+        hud_rects = self.score_display()
+        if tracking:
+            dirty_rects.extend(hud_rects)
+        self.profiler.lap('score_display')
+        overlay_rect = self.profiler.draw(self.screen)
+        if tracking and overlay_rect is not None:
+            dirty_rects.add(overlay_rect)
+        for rect, center in moved:
+            rect.center = center
+
+    def interpolated_sprites(self):
+        yield self.fighter
+        yield from self.black_hole_group
+        yield from self.drone_group
+        yield from self.powerup_group
+        yield from self.enemy_fighter_group
+
+    def interpolate(self, alpha):
+        # moves the sprite rects alpha of the way from their previous tick's centres for drawing only,
+        # returning the rects and centres for draw_game to put back so the simulation never sees it
+        moved = []
+        for sprite in self.interpolated_sprites():
+            previous, center = sprite.prev_center, sprite.rect.center
+            if previous is None or previous == center:
+                continue
+            dx, dy = center[0] - previous[0], center[1] - previous[1]
+            if abs(dx) + abs(dy) <= sprite.max_interpolated_step:
+                moved.append((sprite.rect, center))
+                sprite.rect.center = (round(previous[0] + alpha * dx), round(previous[1] + alpha * dy))
+        return moved
+
+    def gravity_affected_sprites(self):
+        # after the black holes move; the fighter works out its own pull before that
+        yield from self.drone_group
+        yield from self.powerup_group
+        yield from self.enemy_fighter_group
+
+    def toggle_music(self):
+        if not self.music_loaded:
+            return
+        if pygame.mixer.music.get_busy():
+            pygame.mixer.music.stop()
+        else:
+            pygame.mixer.music.play()
 
-    def start_screen_loop(self, events):
-        for event in events:
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if self.is_mouse_over_button('quit'):
-                    self.exit()
-                elif self.is_mouse_over_button('play'):
-                    self.next_level_transition = True
-                    self.next_level_transition_start_time = time.time()
-                    self.game_active = True
-                    self.score = 0
-                elif self.is_mouse_over_button('music'):
-                    if pygame.mixer.music.get_busy():
-                        pygame.mixer.music.stop()
-                    else:
-                        pygame.mixer.music.play()
-                elif self.is_mouse_over_button('effects'):
-                    self.sound_effects = not self.sound_effects
+    def start_screen_loop(self):
+        for _ in range(self.controls.clicks):
+            if self.is_mouse_over_button('quit'):
+                self.exit()
+            elif self.is_mouse_over_button('play'):
+                self.next_level_transition = True
+                self.next_level_transition_start_time = self.clock.now
+                self.game_active = True
+                self.score = 0
+            elif self.is_mouse_over_button('music'):
+                self.toggle_music()
+            elif self.is_mouse_over_button('effects'):
+                self.sound_effects = not self.sound_effects
 
         # Update
-        self.crosshair.update()
+        self.crosshair.update(self.controls.mouse)
 
         # Draw
         self.screen.fill((0, 0, 0))
@@ -1004,25 +2753,76 @@ class RelativityWars:
         self.crosshair.draw(self.screen)
 
     def next_level_transition_loop(self):
-        if self.next_level_transition_start_time > time.time() - 1.5:
+        if self.next_level_transition_start_time > self.clock.now - 1.5:
             self.screen.fill((0, 0, 0))
             self.stars.draw(self.screen)
-            dims = tuple(int(self.next_level_image_scale * d) for d in (350, 172))
-            try:
-                image = self.next_level_images[self.level - 1]
-            except IndexError:
-                image = self.next_level_images[-1]
-            image = pygame.transform.scale(image, dims)
+            dims = tuple(int(self.next_level_image_scale * d) for d in self.next_level_image_dims)
+            image = self.scale_cache.scale(self.next_level_image(), dims)
             rect = image.get_rect(center=self.screen_center)
             self.screen.blit(image, rect)
 
             if self.next_level_image_scale <= 1:
-                self.next_level_image_scale += 0.1
+                self.next_level_image_scale += self.next_level_image_scale_step
         else:
             self.next_level_transition = False
             self.next_level_transition_start_time = 0
-            self.next_level_image_scale = 0.1
+            self.next_level_image_scale = self.next_level_image_start_scale
             self.setup_game()
 
 
-RelativityWars().play()
+def show_splash(screen):
+    # the bare start screen, flipped before the game object and its caches are built
+    screen.fill((0, 0, 0))
+    screen.blit(RelativityWars.start_screen, (785, 300))
+    pygame.display.flip()
+    if RelativityWars.startup_probe:
+        print('splash', flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Relativity Wars')
+    parser.add_argument('--headless', action='store_true', help='simulate without display, sound or frame cap')
+    parser.add_argument('--ticks', type=int, help='headless: number of ticks to simulate')
+    parser.add_argument('--seconds', type=float, help='headless: wall-clock seconds to simulate')
+    parser.add_argument('--level', type=int, default=1, help='headless: starting level')
+    parser.add_argument('--clock', choices=GameClock.modes, default=GameClock.STEPPED, help='headless: game clock mode')
+    parser.add_argument('--speed', type=float, default=1., help='headless: speed factor for the accelerated clock')
+    parser.add_argument('--profile', metavar='PATH', help='record per-stage frame times, written to PATH (.json or .csv) on exit')
+    parser.add_argument('--dirty-rects', action='store_true', help='update only the changed parts of the display')
+    parser.add_argument('--max-fps', type=int, default=RelativityWars.max_fps, help='cap on drawn frames per second, 0 for none; the simulation always ticks at 60')
+    parser.add_argument('--startup-probe', action='store_true', help=argparse.SUPPRESS)  # used by startup_benchmark.py
+    parser.add_argument('--seed', type=int, help='seed for all gameplay randomness')
+    parser.add_argument('--record', metavar='PATH', help='record the session inputs to PATH for --replay')
+    parser.add_argument('--replay', metavar='PATH', help='play back a recorded session headless, as fast as possible')
+    args = parser.parse_args()
+    if args.record and args.headless and not args.startup_probe:
+        # run_headless restarts games and skips level transitions outside tick(), so there is nothing a replay could follow
+        parser.error('--record records the play loop and cannot be combined with --headless')
+    if args.replay:
+        replay = Replay.load(args.replay)
+        game = RelativityWars.from_replay(replay, profiler=FrameProfiler(enabled=args.profile is not None))
+        game.profile_path = args.profile
+        print(json.dumps(game.run_replay(replay)))
+        return
+    RelativityWars.dirty_rect_rendering = args.dirty_rects
+    RelativityWars.max_fps = args.max_fps
+    RelativityWars.startup_probe = args.startup_probe
+    if not args.headless or args.startup_probe:
+        show_splash(screen)
+        if not HEADLESS:
+            assets.preload_sounds(LazySound.names)
+    game = RelativityWars(level=args.level, profiler=FrameProfiler(enabled=args.profile is not None), seed=args.seed)
+    game.profile_path = args.profile
+    if args.record:
+        game.record(args.record)
+    if args.headless and not args.startup_probe:
+        if args.ticks is None and args.seconds is None:
+            args.ticks = 3600
+        stats = game.run_headless(ticks=args.ticks, seconds=args.seconds, clock_mode=args.clock, clock_speed=args.speed)
+        print(json.dumps(stats))
+    else:
+        game.play()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import numpy as np
+
+
+MILESTONES = ('splash', 'first_frame')
+PERCENTILES = (50, 95)
+
+
+def measure_once(headless):
+    # wall time from spawning the interpreter until main.py reports each flip on stdout
+    command = [sys.executable, 'main.py', '--startup-probe'] + (['--headless'] if headless else [])
+    env = dict(os.environ, RW_HEADLESS='1') if headless else None
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, env=env)
+    times = {}
+    for line in process.stdout:
+        if line.strip() in MILESTONES:
+            times[line.strip()] = time.perf_counter() - start
+    process.wait()
+    missing = [m for m in MILESTONES if m not in times]
+    if missing:
+        raise RuntimeError(f'main.py exited with {process.returncode} before reporting {", ".join(missing)}')
+    return times
+
+
+def summarize(samples):
+    samples = np.array(samples) * 1000
+    summary = {f'p{p}': float(np.percentile(samples, p)) for p in PERCENTILES}
+    summary.update({'min': float(samples.min()), 'mean': float(samples.mean())})
+    return summary
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Time process start to the first display flips of main.py')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--display', action='store_true', help='open the real display instead of the SDL dummy driver')
+    parser.add_argument('--output', help='write the summary as JSON to this path')
+    args = parser.parse_args()
+
+    runs = [measure_once(headless=not args.display) for _ in range(args.runs)]
+    report = {milestone: summarize([run[milestone] for run in runs]) for milestone in MILESTONES}
+    for milestone, summary in report.items():
+        print(f"{milestone:>12}  p50 {summary['p50']:7.1f} ms  p95 {summary['p95']:7.1f} ms  min {summary['min']:7.1f} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps({'runs': args.runs, 'startup_ms': report}, indent=2))
+
+
+if __name__ == '__main__':
+    main_cli()
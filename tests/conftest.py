@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ['RW_HEADLESS'] = '1'  # SDL dummy video/audio drivers, see main.HEADLESS
+os.chdir(ROOT)  # assets and vars.json are opened relative to the repository
+sys.path.insert(0, ROOT)
@@ -0,0 +1,65 @@
+import types
+
+import pygame
+import pytest
+
+import main
+
+
+@pytest.fixture
+def audio():
+    pygame.mixer.stop()
+    yield main.AudioManager(types.SimpleNamespace(sound_effects=True))
+    pygame.mixer.stop()
+
+
+def busy_voices(audio, sound, category):
+    return sum(1 for channel in audio.channels[category] if channel.get_busy() and channel.get_sound() is sound)
+
+
+def test_torpedo_burst_is_coalesced_and_voice_capped(audio):
+    sound = main.DroneBase.torpedo_sound
+    for _ in range(5):
+        for _ in range(10):
+            audio.play(sound, 'weapons')
+        audio.flush()
+    # one play per frame until the three voices of the sound are busy, then drops
+    assert audio.played == 3
+    assert audio.dropped == 2
+    assert audio.coalesced == 5 * 9
+    assert busy_voices(audio, sound, 'weapons') == main.AudioManager.groups['weapons']['voices']
+
+
+def test_voice_cap_is_per_sound(audio):
+    for _ in range(4):
+        audio.play(main.DroneBase.torpedo_sound, 'deaths')
+        audio.play(main.Drone.sound_death, 'deaths')
+        audio.flush()
+    assert audio.played == 6
+    assert audio.dropped == 2
+    assert audio.coalesced == 0
+
+
+def test_full_channel_group_drops(audio):
+    # powerups has two channels and one voice per sound, so a third distinct sound finds no free channel
+    sounds = [main.Fighter.shield_up_sound, main.Fighter.shield_down_sound, main.Fighter.boost_sound]
+    for sound in sounds:
+        audio.play(sound, 'powerups')
+    audio.flush()
+    assert audio.played == 2
+    assert audio.dropped == 1
+
+
+def test_sound_effects_off_queues_nothing(audio):
+    audio.game.sound_effects = False
+    audio.play(main.DroneBase.torpedo_sound, 'weapons')
+    audio.flush()
+    assert audio.played == audio.dropped == audio.coalesced == 0
+
+
+def test_reset_counters(audio):
+    audio.play(main.DroneBase.torpedo_sound, 'weapons')
+    audio.play(main.DroneBase.torpedo_sound, 'weapons')
+    audio.flush()
+    audio.reset_counters()
+    assert audio.played == audio.dropped == audio.coalesced == 0
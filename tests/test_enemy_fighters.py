@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+
+import main
+
+EnemyFighter = main.EnemyFighter
+
+
+def steer_one(pos, velocity, gravity, direction, acceleration, target):
+    # the per-sprite rules steer replaces, one fighter at a time
+    magnitude_gravity = EnemyFighter.hypotenuse(gravity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        unit_gravity = gravity / magnitude_gravity
+    velocity_max_escape = velocity + gravity - unit_gravity * acceleration
+    angle_gravity = EnemyFighter.get_angle_from_vector(gravity)
+    theta = angle_gravity + math.pi
+    speed_max_escape = np.absolute(velocity_max_escape * np.array([math.cos(theta), math.sin(theta)])).sum()
+    acceleration = EnemyFighter.max_acceleration
+    dist_from_fighter = EnemyFighter.hypotenuse(pos - target)
+    if speed_max_escape < magnitude_gravity:
+        direction = angle_gravity + math.pi
+    elif dist_from_fighter < EnemyFighter.hold_dist:
+        acceleration = 0
+    elif dist_from_fighter < EnemyFighter.proximity_dist:
+        acceleration = EnemyFighter.max_acceleration / (EnemyFighter.proximity_dist - EnemyFighter.hold_dist) * (dist_from_fighter - EnemyFighter.hold_dist)
+    else:
+        direction = EnemyFighter.get_angle_from_vector(target - pos)
+    return direction, acceleration
+
+
+def volley_one(pos, target, time_since_last_fire, volley_shots_fired):
+    dist_from_fighter = EnemyFighter.hypotenuse(pos - target)
+    if dist_from_fighter < EnemyFighter.hold_dist and time_since_last_fire > EnemyFighter.fire_refresh:
+        return EnemyFighter.START_VOLLEY
+    elif volley_shots_fired < EnemyFighter.volley_size and time_since_last_fire > EnemyFighter.intra_volley_wait * volley_shots_fired:
+        return EnemyFighter.CONTINUE_VOLLEY
+    return EnemyFighter.HOLD_FIRE
+
+
+def test_steer_and_volleys_match_the_scalar_rules():
+    rng = np.random.default_rng(21)
+    count = 2000
+    target = np.array(main.HEADLESS_SCREEN_SHAPE) / 2
+    # distances spread over every band: hold, slow down and pursue
+    pos = target + rng.uniform(-1000, 1000, (count, 2))
+    velocity = rng.normal(0, 3, (count, 2))
+    # weak pulls, ones strong enough to escape from, on-axis ones and no pull at all
+    gravity = rng.normal(0, 1, (count, 2)) * rng.choice([0.1, 2, 10], (count, 1))
+    gravity[::7, 0] = 0
+    gravity[::11] = 0
+    direction = rng.uniform(-math.pi, math.pi, count)
+    acceleration = rng.choice([0, 0.5, EnemyFighter.max_acceleration], count)
+    time_since_last_fire = rng.uniform(0, 5, count)
+    volley_shots_fired = rng.integers(0, EnemyFighter.volley_size + 1, count).astype('float64')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        batched = EnemyFighter.steer(pos, velocity, gravity, direction, acceleration, target)
+    volleys = EnemyFighter.volleys(pos, target, time_since_last_fire, volley_shots_fired)
+    scalar = np.array([steer_one(*row, target) for row in zip(pos, velocity, gravity, direction, acceleration)])
+    assert np.array_equal(np.stack(batched, axis=1), scalar)
+    assert np.array_equal(volleys, [volley_one(*row) for row in zip(pos, [target] * count, time_since_last_fire, volley_shots_fired)])
+    # the population reaches every branch
+    assert set(volleys.tolist()) == {EnemyFighter.HOLD_FIRE, EnemyFighter.START_VOLLEY, EnemyFighter.CONTINUE_VOLLEY}
+    assert (batched[1] == 0).any() and ((batched[1] > 0) & (batched[1] < 1)).any()
+    assert (batched[0] != direction).any() and (batched[0] == direction).any()
+
+
+def test_steer_all_matches_the_scalar_rules_in_game():
+    game = main.RelativityWars(level=3, seed=21)
+    game.run_headless(ticks=1)
+    rng = np.random.default_rng(21)
+    for _ in range(40):
+        game.spawn_enemy_fighter()
+    enemy_fighters = list(game.enemy_fighter_group)
+    for enemy_fighter in enemy_fighters:
+        enemy_fighter.pos[:] = game.fighter.pos + rng.uniform(-900, 900, 2)
+        enemy_fighter.last_fired_time = game.clock.now - rng.uniform(0, 5)
+        enemy_fighter.volley_shots_fired = int(rng.integers(0, EnemyFighter.volley_size + 1))
+    gravity = game.gravity_engine.calculate([enemy_fighter.pos for enemy_fighter in enemy_fighters]) * 0.7
+    EnemyFighter.steer_all(enemy_fighters, game.fighter.pos)
+    for enemy_fighter, pull in zip(enemy_fighters, gravity):
+        direction, acceleration = steer_one(enemy_fighter.pos, enemy_fighter.velocity, pull, enemy_fighter.direction,
+                                            enemy_fighter.acceleration, game.fighter.pos)
+        volley = volley_one(enemy_fighter.pos, game.fighter.pos, game.clock.now - enemy_fighter.last_fired_time,
+                            enemy_fighter.volley_shots_fired)
+        assert np.array_equal(enemy_fighter.steering[0], pull)
+        assert enemy_fighter.steering[1:] == (direction, acceleration, volley)
@@ -0,0 +1,128 @@
+import types
+
+import numpy as np
+import pytest
+
+import main
+
+SCREEN_SHAPE = np.array(main.HEADLESS_SCREEN_SHAPE)
+
+
+def errors(grid, positions, black_holes):
+    return np.hypot(*(grid.lookup(positions) - main.GravityEngine.field(positions, black_holes)).T)
+
+
+@pytest.mark.parametrize('holes', [2, 3, 10, 30])
+def test_grid_error_against_exact(holes):
+    rng = np.random.default_rng(holes)
+    black_holes = rng.random((holes, 2)) * SCREEN_SHAPE
+    positions = rng.random((20000, 2)) * SCREEN_SHAPE
+    error = errors(main.GravityGrid(black_holes, SCREEN_SHAPE, 16, 2), positions, black_holes)
+    assert np.percentile(error, 95) < 0.05
+    assert error.max() < 1
+
+
+@pytest.mark.parametrize('holes', [3, 30])
+def test_grid_on_hole_axes(holes):
+    # each axis of the pull flips sign across a hole's row or column, which no interpolation can follow
+    rng = np.random.default_rng(0)
+    black_holes = rng.random((holes, 2)) * SCREEN_SHAPE
+    along = rng.random(300) * SCREEN_SHAPE[0]
+    offsets = rng.uniform(-1, 1, 300)
+    positions = np.concatenate([np.stack([along, black_holes[i, 1] + offsets], axis=1) for i in range(holes)])
+    assert errors(main.GravityGrid(black_holes, SCREEN_SHAPE, 16, 2), positions, black_holes).max() < 0.5
+
+
+@pytest.mark.parametrize('holes', [3, 30])
+def test_grid_spreads_resampling_over_frames(holes):
+    rng = np.random.default_rng(1)
+    black_holes = rng.random((holes, 2)) * SCREEN_SHAPE
+    positions = rng.random((5000, 2)) * SCREEN_SHAPE
+    grid = main.GravityGrid(black_holes, SCREEN_SHAPE, 16, 2)
+    angles = rng.random(holes) * 2 * np.pi
+    for _ in range(60):
+        angles += rng.normal(0, 0.1, holes)
+        black_holes = black_holes + main.BlackHole.speed * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        sampled = grid.black_holes.copy()
+        assert grid.update(black_holes)
+        # holes moving 0.5 px a frame with a 2 px tolerance need a quarter of them resampled a frame
+        assert (grid.black_holes != sampled).any(axis=1).sum() <= np.ceil(holes / 4)
+        assert np.hypot(*(grid.black_holes - black_holes).T).max() <= 2
+        error = errors(grid, positions, black_holes)
+        assert np.percentile(error, 95) < 0.05
+        assert error.max() < 1
+
+
+def test_grid_leaves_few_entities_to_the_exact_sum():
+    game = types.SimpleNamespace(game_params=main.GameParams(1), screen_shape=SCREEN_SHAPE,
+                                 black_hole_group=[types.SimpleNamespace(pos=pos) for pos in ((300.0, 200.0), (900.0, 700.0))])
+    game.game_params.gravity_mode = main.GravityEngine.GRID
+    engine = main.GravityEngine(game)
+    positions = np.random.default_rng(0).random((100, 2)) * SCREEN_SHAPE
+    assert np.array_equal(engine.calculate(positions), main.GravityEngine.field(positions, engine.black_hole_positions()))
+    assert engine.grid is None
+
+
+def test_grid_rebuilds_when_hole_count_changes():
+    black_holes = np.array([[300.0, 200.0], [900.0, 700.0]])
+    grid = main.GravityGrid(black_holes, SCREEN_SHAPE, 16, 2)
+    assert not grid.update(black_holes[:1])
+
+
+def test_cutoff_with_no_entity_in_reach():
+    black_holes = np.array([[100.0, 100.0], [150.0, 120.0]])
+    positions = np.array([[1800.0, 1000.0], [1700.0, 900.0]])
+    vector, bound = main.GravityEngine.cutoff_field(positions, black_holes, 400)
+    assert vector.dtype == np.float64
+    assert np.array_equal(main.GravityEngine.clamped(vector), np.zeros((2, 2)))
+    assert (bound == 2 * main.GravityEngine.GRAVITATIONAL_CONSTANT / 400**1.1).all()
+
+
+@pytest.mark.parametrize('holes', [3, 60])
+def test_cutoff_game_runs(monkeypatch, holes):
+    # past cutoff_error's limit setup_game falls back to BARNES_HUT instead of the frame loop raising
+    monkeypatch.setattr(main.GameParams, 'gravity_mode', main.GravityEngine.CUTOFF)
+    monkeypatch.setattr(main.GameParams, 'black_holes', holes)
+    game = main.RelativityWars(level=1, seed=1)
+    assert game.run_headless(ticks=60)['ticks'] == 60
+    safe = main.GravityEngine.cutoff_error(holes, main.GameParams.gravity_cutoff) <= main.GravityEngine.MAX_GRAVITY
+    assert game.game_params.gravity_mode == (main.GravityEngine.CUTOFF if safe else main.GravityEngine.BARNES_HUT)
+
+
+@pytest.mark.parametrize('holes', [20, 300])
+@pytest.mark.parametrize('theta', [0.3, 0.5, 0.7])
+def test_barnes_hut_error_within_bound(monkeypatch, holes, theta):
+    monkeypatch.setattr(main.BarnesHutTree, 'DIRECT_PAIRS', 0)  # walk the tree at any size
+    rng = np.random.default_rng(holes)
+    black_holes = rng.random((holes, 2)) * SCREEN_SHAPE
+    positions = rng.random((3000, 2)) * SCREEN_SHAPE
+    vector, bound = main.BarnesHutTree(black_holes).field(positions, theta)
+    exact = main.GravityEngine.pull(positions, black_holes)
+    assert (np.abs(vector - exact) <= bound[:, np.newaxis] + 1e-9).all()
+    clamped_error = np.hypot(*(main.GravityEngine.clamped(vector) - main.GravityEngine.clamped(exact)).T)
+    assert (clamped_error <= np.sqrt(2) * bound + 1e-9).all()
+    if theta <= 0.5:
+        assert np.median(bound) < 1
+
+
+def test_barnes_hut_sums_directly_below_direct_pairs():
+    rng = np.random.default_rng(0)
+    black_holes = rng.random((50, 2)) * SCREEN_SHAPE
+    positions = rng.random((1000, 2)) * SCREEN_SHAPE
+    vector, bound = main.BarnesHutTree(black_holes).field(positions, 0.5)
+    assert np.allclose(vector, main.GravityEngine.pull(positions, black_holes), rtol=1e-12, atol=1e-12)
+    assert (bound == 0).all()
+
+
+def test_fighter_is_pulled_by_black_holes_before_they_move(monkeypatch):
+    game = main.RelativityWars(level=1, seed=1)
+    game.run_headless(ticks=1)
+    pulls = []
+    calculate_gravity = main.Fighter.calculate_gravity
+    monkeypatch.setattr(main.Fighter, 'calculate_gravity', lambda self: pulls.append(calculate_gravity(self)) or pulls[-1])
+    for _ in range(30):
+        black_holes, pos = game.gravity_engine.black_hole_positions(), game.fighter.pos.copy()
+        game.clock.tick()
+        game.update_game([])
+        assert np.array_equal(pulls[-1], main.GravityEngine.field(pos[np.newaxis], black_holes)[0])
+        assert not np.array_equal(black_holes, game.gravity_engine.black_hole_positions())
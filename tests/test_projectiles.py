@@ -0,0 +1,58 @@
+import numpy as np
+import pygame
+import pytest
+
+import main
+
+TORPEDO_SIZE = np.array(main.Torpedo.raw_image.get_size())
+
+
+@pytest.mark.parametrize('prev_pos, pos, hit', [
+    ((50, 105), (170, 105), True),  # straight through in one step
+    ((50, 150), (170, 150), False),  # past it, below
+    ((50, 105), (80, 105), False),  # stops short
+    ((105, 40), (105, 170), True),  # no sideways step
+    ((150, 40), (150, 170), False),
+    ((40, 40), (170, 170), True),  # diagonally through it
+    ((60, 110), (110, 60), True),  # clips the corner
+    ((60, 100), (100, 60), False),  # passes the corner, just outside it
+    ((60, 60), (60, 60), False),  # still and clear of it
+    ((100, 100), (100, 100), True),  # still and overlapping it
+])
+def test_touches_sweeps_from_the_previous_position(prev_pos, pos, hit):
+    # target rect (90, 90) to (130, 130), the size of a drone
+    topleft, target_size = np.array([90, 90]), np.array([40, 40])
+    assert main.Projectiles.touches(np.array([pos], dtype='float64'), np.array([prev_pos], dtype='float64'),
+                                    TORPEDO_SIZE[np.newaxis], topleft, target_size).tolist() == [hit]
+
+
+def test_sweeps_collide_is_symmetric_in_direction():
+    rng = np.random.default_rng(24)
+    start, end = rng.uniform(0, 300, (2, 5000, 2))
+    size = np.broadcast_to(TORPEDO_SIZE, (5000, 2))
+    topleft, target_size = rng.integers(50, 200, (5000, 2)), rng.integers(1, 60, (5000, 2))
+    assert np.array_equal(main.RWSprite.sweeps_collide(start, end, size, topleft, target_size),
+                          main.RWSprite.sweeps_collide(end, start, size, topleft, target_size))
+
+
+@pytest.mark.parametrize('offset, hit', [(0, True), (main.Drone.image.get_height(), False)])
+def test_fast_zerog_torpedo_through_a_drone(monkeypatch, offset, hit):
+    # a torpedo faster than a drone is wide is clear of it both before and after the frame it passes through
+    monkeypatch.setitem(main.Torpedo.skin_speeds, 'zerog', 120)
+    game = main.RelativityWars(level=1, seed=24)
+    game.run_headless(ticks=1)
+    game.drone_group.empty()
+    game.spawn_drone()
+    drone = game.drone_group.sprites()[0]
+    drone.pos = np.array([900.0, 300.0])
+    drone.center_to_pos()
+    start = (drone.rect.left - TORPEDO_SIZE[0], drone.rect.centery + offset)
+    slot = game.torpedo_group.fire(start, 0., skin='zerog')[0]
+    game.projectiles.update()
+    game.spatial_hash.index_projectiles()
+    for pos in (game.projectiles.prev_pos[slot], game.projectiles.pos[slot]):
+        assert not drone.rect.colliderect(pygame.Rect(*main.RWSprite.centred_topleft(pos, TORPEDO_SIZE), *TORPEDO_SIZE))
+    assert game.projectiles.pos[slot, 0] > drone.rect.right
+    torpedos = game.torpedo_group.collide_all([drone.rect], True)[0]
+    assert len(torpedos) == hit
+    assert game.projectiles.alive[slot] != hit
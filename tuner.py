@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+import multiprocessing
+import numpy as np
+
+os.environ['RW_HEADLESS'] = '1'  # SDL dummy video/audio drivers, see main.HEADLESS
+os.environ['SDL_NO_SIGNAL_HANDLERS'] = '1'  # otherwise SDL turns SIGTERM into a QUIT event and Pool.terminate() hangs
+import main
+
+
+TUNABLE = ('lives', 'dronespawn_freq', 'dronespawn_freq_ramp', 'black_holes', 'black_hole_total_size',
+           'powerupspawn_freq', 'nextlevel_freq', 'enemyfighterspawn_freq')
+DEFAULTS = {field: getattr(main.GameParams, field) for field in TUNABLE}
+ENTITY_GROUPS = ('drone_group', 'enemy_fighter_group', 'torpedo_group', 'enemy_torpedo_group', 'black_hole_group', 'powerup_group')
+
+
+class RandomPilot:
+    # mashes WASD, changing direction every so often, and fires at random points
+    def __init__(self, game, rng):
+        self.game = game
+        self.rng = rng
+        self.buttons = 0
+
+    def controls(self, tick):
+        if tick % 30 == 0:
+            self.buttons = sum(bit for bit in (main.Controls.W, main.Controls.A, main.Controls.S, main.Controls.D)
+                               if self.rng.random() < 0.4)
+        mouse = (self.rng.randrange(self.game.screen_width), self.rng.randrange(self.game.screen_height))
+        return main.Controls(self.buttons, int(self.rng.random() < 0.1), mouse)
+
+
+class ScriptedPilot:
+    # keeps away from black holes (boosting when close), otherwise drifts to the centre, and shoots the nearest target
+    flee_distance = 350
+    boost_distance = 150
+    fire_interval = 8
+
+    def __init__(self, game, rng):
+        self.game = game
+        self.rng = rng
+
+    def controls(self, tick):
+        game, fighter = self.game, self.game.fighter
+        buttons = 0
+        holes = [hole.pos for hole in game.black_hole_group]
+        if holes:
+            offsets = fighter.pos - np.array(holes, dtype='float64')
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+            nearest = int(np.argmin(distances))
+        if holes and distances[nearest] < self.flee_distance:
+            heading = offsets[nearest]
+            if distances[nearest] < self.boost_distance and fighter.boost_available:
+                buttons |= main.Controls.SHIFT
+        else:
+            heading = np.array(game.screen_center, dtype='float64') - fighter.pos
+        for axis, negative, positive in ((0, main.Controls.A, main.Controls.D), (1, main.Controls.W, main.Controls.S)):
+            if heading[axis] < -20:
+                buttons |= negative
+            elif heading[axis] > 20:
+                buttons |= positive
+
+        targets = [sprite.pos for sprite in itertools.chain(game.drone_group, game.enemy_fighter_group) if sprite.death_time is None]
+        mouse, clicks = (int(fighter.pos[0]), int(fighter.pos[1])), 0
+        if targets:
+            targets = np.array(targets, dtype='float64')
+            target = targets[np.argmin(np.hypot(*(targets - fighter.pos).T))]
+            mouse = (int(target[0]), int(target[1]))
+            clicks = int(tick % self.fire_interval == 0)
+        return main.Controls(buttons, clicks, mouse)
+
+
+PILOTS = {'random': RandomPilot, 'scripted': ScriptedPilot}
+
+
+def apply_params(params):
+    for field, value in dict(DEFAULTS, **params).items():
+        setattr(main.GameParams, field, value)
+
+
+def run_game(task):
+    # one headless game from task['level'] until game over or max_ticks; runs inside a pool worker
+    apply_params(task['params'])
+    random.seed(task['seed'])
+    game = main.RelativityWars(level=task['level'], seed=task['seed'])
+    game.render = task['render']
+    game.sound_effects = False
+    game.clock.set_mode(main.GameClock.STEPPED)
+    game.game_active = True
+    game.next_level_transition = False
+    game.score = 0
+    game.setup_game()
+    pilot = PILOTS[task['pilot']](game, random.Random(task['seed']))
+
+    frame_times = []
+    peaks = dict.fromkeys(ENTITY_GROUPS, 0)
+    score_per_level = {}
+    level, level_score = game.level, 0
+    tick = 0
+    while tick < task['max_ticks'] and game.game_active:
+        game.clock.tick()
+        controls = pilot.controls(tick)
+        start = time.perf_counter()
+        game.game_loop([], controls)
+        frame_times.append(time.perf_counter() - start)
+        tick += 1
+        for name in ENTITY_GROUPS:
+            peaks[name] = max(peaks[name], len(getattr(game, name)))
+        if game.game_active and game.next_level_transition:
+            score_per_level[level] = game.score - level_score
+            level, level_score = game.level, game.score
+            game.next_level_transition = False
+            game.setup_game()
+    score_per_level[level] = game.score - level_score
+
+    frame_ms = np.array(frame_times) * 1000
+    return {'id': task['id'],
+            'params': task['params'],
+            'seed': task['seed'],
+            'pilot': task['pilot'],
+            'start_level': task['level'],
+            'reached_level': level,
+            'survived': game.game_active,
+            'survival_seconds': tick / game.fps,
+            'score': game.score,
+            'score_per_level': score_per_level,
+            'peak_entities': peaks,
+            'frame_ms': {'p50': float(np.percentile(frame_ms, 50)), 'p95': float(np.percentile(frame_ms, 95)),
+                         'max': float(frame_ms.max()), 'mean': float(frame_ms.mean())} if tick else None}
+
+
+def parse_sweep(specs):
+    sweep = {}
+    for spec in specs or ():
+        field, _, values = spec.partition('=')
+        if field not in TUNABLE:
+            raise SystemExit(f'unknown GameParams field {field!r}, expected one of {", ".join(TUNABLE)}')
+        sweep[field] = [type(DEFAULTS[field])(value) for value in values.split(',')]
+    return sweep
+
+
+def make_tasks(sweep, games, seed, level, pilot, max_ticks, render):
+    fields = sorted(sweep)
+    combinations = list(itertools.product(*(sweep[field] for field in fields)))
+    tasks = []
+    for combination in combinations:
+        params = dict(zip(fields, combination))
+        for game_index in range(games):
+            tasks.append({'id': f'{json.dumps(params, sort_keys=True)}/{level}/{pilot}/{seed + game_index}',
+                          'params': params,
+                          'seed': seed + game_index,
+                          'level': level,
+                          'pilot': pilot,
+                          'max_ticks': max_ticks,
+                          'render': render})
+    return tasks
+
+
+def read_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(results, budget_ms):
+    groups = {}
+    for result in results:
+        groups.setdefault(json.dumps(result['params'], sort_keys=True), []).append(result)
+    rows = []
+    for params, group in groups.items():
+        timed = [r['frame_ms'] for r in group if r['frame_ms']]
+        rows.append({'params': json.loads(params),
+                     'games': len(group),
+                     'survival_seconds': float(np.mean([r['survival_seconds'] for r in group])),
+                     'score': float(np.mean([r['score'] for r in group])),
+                     'reached_level': float(np.mean([r['reached_level'] for r in group])),
+                     'peak_entities': max(sum(r['peak_entities'].values()) for r in group),
+                     'frame_p95_ms': float(np.mean([t['p95'] for t in timed])) if timed else None,
+                     'frame_max_ms': max(t['max'] for t in timed) if timed else None,
+                     'within_budget': all(t['p95'] <= budget_ms for t in timed)})
+    return sorted(rows, key=lambda row: (not row['within_budget'], -row['survival_seconds']))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Run many headless bot games over a grid of GameParams overrides')
+    parser.add_argument('--sweep', action='append', metavar='FIELD=V1,V2,...', help='GameParams field values to sweep (repeatable, grid product)')
+    parser.add_argument('--games', type=int, default=20, help='games per parameter set')
+    parser.add_argument('--level', type=int, default=1, help='starting level')
+    parser.add_argument('--pilot', choices=PILOTS, default='scripted')
+    parser.add_argument('--max-ticks', type=int, default=60 * 60 * 5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--render', action='store_true', help='include draw_game in the frame cost')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--budget-ms', type=float, default=1000 / main.RelativityWars.fps, help='frame time budget for the p95')
+    parser.add_argument('--output', default='tuner_results.jsonl', help='one JSON line per game, appended as games finish')
+    parser.add_argument('--summarize', action='store_true', help='only summarize an existing output file')
+    args = parser.parse_args()
+
+    if not args.summarize:
+        tasks = make_tasks(parse_sweep(args.sweep), args.games, args.seed, args.level, args.pilot, args.max_ticks, args.render)
+        done = {result['id'] for result in read_results(args.output)}  # rerunning with the same sweep resumes it
+        tasks = [task for task in tasks if task['id'] not in done]
+        print(f'{len(tasks)} games to run ({len(done)} already in {args.output}) on {args.processes} processes', file=sys.stderr)
+        with multiprocessing.get_context('spawn').Pool(args.processes) as pool, open(args.output, 'a') as f:
+            for finished, result in enumerate(pool.imap_unordered(run_game, tasks), 1):
+                f.write(json.dumps(result) + '\n')
+                f.flush()
+                if finished % max(1, len(tasks) // 20) == 0:
+                    print(f'{finished}/{len(tasks)}', file=sys.stderr)
+
+    for row in summarize(read_results(args.output), args.budget_ms):
+        print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,349 @@
+import os
+import math
+import numpy as np
+
+os.environ.setdefault('RW_HEADLESS', '1')  # SDL dummy video/audio drivers unless the caller opened a display
+import pygame
+import main
+from main import RWSprite, GravityEngine, BlackHole, Fighter, DroneBase, Drone, Torpedo, Projectiles, GameParams, RotationCache
+
+
+class VecEnv:
+    # K independent games stepped in lockstep in (K, ...) arrays, with the sprite classes' constants and the same array
+    # steps their updates run: GravityEngine.field, DroneBase.drifted, Fighter.thrusted, BlackHole.turned,
+    # Drone.lifecycle, Projectiles.touches and the RWSprite helpers, on the rect sizes the sprites collide with.
+    # Covers the fighter, drones, torpedoes and black holes; powerups and enemy fighters are left out.
+    #
+    # action: (K, 4) float: move (0 no thrust, 1-8 a Fighter.directions entry in order), boost (0/1), fire (0/1),
+    #         aim angle in radians (game convention: 0 is right, pi/2 is up)
+    # step() returns obs (K, obs_size) float32, reward (K,) float32, done (K,) bool, info dict; finished games restart
+    directions = tuple(Fighter.directions)
+    direction_vectors = np.array([d['vector'] for d in Fighter.directions.values()])
+    obs_black_holes = 3
+    obs_drones = 8
+    obs_torpedoes = 16
+
+    def __init__(self, num_envs, level=1, seed=None, screen_shape=main.screen_shape, max_steps=60 * 60 * 3,
+                 max_drones=64, max_torpedoes=64, max_enemy_torpedoes=512, life_penalty=1.):
+        self.num_envs = num_envs
+        self.screen_shape = np.array(screen_shape, dtype='float64')
+        self.params = GameParams(level)
+        self.dt = 1 / main.RelativityWars.fps
+        self.max_steps = max_steps
+        self.life_penalty = life_penalty
+        self.rng = np.random.default_rng(seed)
+        self.rotation_cache = RotationCache()
+        self.torpedo_sizes = np.array([self.rotation_cache.rotate(Torpedo.raw_image, bucket * 360 / self.rotation_cache.buckets).get_size()
+                                       for bucket in range(self.rotation_cache.buckets)])
+        self.fighter_size = np.array(Fighter.rect.size)  # the class-level rect never changes size
+        self.drone_size = np.array(Drone.image.get_size())
+
+        K, H, D = num_envs, self.params.black_holes, max_drones
+        self.holes = {'pos': np.zeros((K, H, 2)), 'size': np.zeros((K, H), dtype='int64'), 'rect_size': np.zeros((K, H), dtype='int64'),
+                      'direction': np.zeros((K, H)), 'radius': np.zeros((K, H)), 'arc': np.zeros((K, H)), 'traversed': np.zeros((K, H))}
+        self.drones = {'pos': np.zeros((K, D, 2)), 'velocity': np.zeros((K, D, 2)), 'alive': np.zeros((K, D), dtype=bool),
+                       'init_time': np.zeros((K, D)), 'last_fired': np.zeros((K, D)), 'death_time': np.full((K, D), np.nan),
+                       'death_angle': np.zeros((K, D))}
+        self.torpedoes = self.torpedo_pool(K, max_torpedoes)
+        self.enemy_torpedoes = self.torpedo_pool(K, max_enemy_torpedoes)
+        self.fighter = {'pos': np.zeros((K, 2)), 'velocity': np.zeros((K, 2)), 'direction': np.zeros(K, dtype='int64'),
+                        'death_time': np.full(K, np.nan), 'reset_time': np.zeros(K), 'boost_last_used': np.full(K, -np.inf),
+                        'boost_active': np.zeros(K, dtype=bool), 'reset_active': np.zeros(K, dtype=bool)}
+        self.now = np.zeros(K)
+        self.steps = np.zeros(K, dtype='int64')
+        self.score = np.zeros(K, dtype='int64')
+        self.lives = np.zeros(K, dtype='int64')
+        self.dronespawn_freq = np.zeros(K)
+        self.drone_due = np.zeros(K)
+        self.increase_due = np.zeros(K)
+        self.dropped = 0  # spawns and launches that didn't fit in the arrays
+        self.reset()
+
+    @staticmethod
+    def torpedo_pool(K, capacity):
+        return {'pos': np.zeros((K, capacity, 2)), 'prev_pos': np.zeros((K, capacity, 2)), 'velocity': np.zeros((K, capacity, 2)), 'angle': np.zeros((K, capacity)),
+                'size': np.zeros((K, capacity, 2), dtype='int64'), 'alive': np.zeros((K, capacity), dtype=bool)}
+
+    @property
+    def obs_size(self):
+        return 7 + 4 * self.obs_black_holes + 5 * self.obs_drones + 5 * self.obs_torpedoes
+
+    def reset(self, mask=None):
+        # RelativityWars.setup_game for the games in mask (all by default)
+        envs = np.arange(self.num_envs) if mask is None else np.flatnonzero(mask)
+        n, H = len(envs), self.params.black_holes
+        if not n:
+            return self.observe()
+        self.now[envs] = 0
+        self.steps[envs] = 0
+        self.score[envs] = 0
+        self.lives[envs] = self.params.lives
+        self.dronespawn_freq[envs] = self.params.dronespawn_freq
+        self.drone_due[envs] = self.dronespawn_freq[envs] / 1000
+        self.increase_due[envs] = main.RelativityWars.INCREASEDRONESPAWN_FREQ / 1000
+        for pool in (self.drones, self.torpedoes, self.enemy_torpedoes):
+            pool['alive'][envs] = False
+
+        rand = self.rng.random((n, H)) + 1
+        sizes = (self.params.black_hole_total_size / rand.sum(axis=1, keepdims=True) * rand).astype('int64')
+        holes = self.holes
+        holes['size'][envs] = holes['rect_size'][envs] = sizes
+        holes['pos'][envs] = np.stack([self.rng.integers(200, self.screen_shape[0] - 200, (n, H)),
+                                       self.rng.integers(200, self.screen_shape[1] - 200, (n, H))], axis=-1)
+        holes['direction'][envs] = self.rng.integers(0, 7, (n, H))
+        holes['traversed'][envs] = 0
+        self.new_arcs(envs[:, np.newaxis] * np.ones(H, dtype='int64'), np.arange(H) * np.ones((n, 1), dtype='int64'))
+
+        fighter = self.fighter
+        fighter['boost_last_used'][envs] = -np.inf
+        fighter['boost_active'][envs] = False
+        self.reset_fighters(envs)
+        return self.observe()
+
+    def new_arcs(self, envs, holes):
+        # BlackHole.random_arc for the (env, hole) pairs given
+        radius = self.rng.integers(BlackHole.MIN_PATH_RADIUS, int(self.screen_shape[1] / 2), envs.shape, endpoint=True)
+        self.holes['radius'][envs, holes] = radius
+        self.holes['arc'][envs, holes] = self.rng.integers(1, BlackHole.MAX_PATH_TURNS + 1, envs.shape) * self.rng.choice([-1, 1], envs.shape) * radius
+        self.holes['traversed'][envs, holes] = 0
+
+    def reset_fighters(self, envs):
+        # Fighter.reset
+        fighter = self.fighter
+        fighter['direction'][envs] = self.directions.index('right')
+        fighter['velocity'][envs] = 0
+        fighter['pos'][envs] = Fighter.initial_pos
+        fighter['death_time'][envs] = np.nan
+        fighter['reset_time'][envs] = self.now[envs]
+        fighter['reset_active'][envs] = True
+
+    def launch(self, pool, envs, pos, angles, speed):
+        # Projectiles.launch: one torpedo per (env, pos, angle) row, into each env's lowest free slots
+        if not len(envs):
+            return
+        order = np.argsort(envs, kind='stable')
+        envs, pos, angles = envs[order], pos[order], angles[order]
+        rank = np.arange(len(envs)) - np.searchsorted(envs, envs)  # nth launch within its env
+        free = np.argsort(pool['alive'][envs], axis=1, kind='stable')  # free slots first
+        fits = rank < (~pool['alive'][envs]).sum(axis=1)
+        self.dropped += int((~fits).sum())
+        envs, pos, angles, rank = envs[fits], pos[fits], angles[fits], rank[fits]
+        slots = free[fits][np.arange(len(envs)), rank]
+        pool['pos'][envs, slots] = pool['prev_pos'][envs, slots] = pos
+        pool['velocity'][envs, slots] = RWSprite.get_unit_vectors_from_angles(angles) * speed
+        pool['angle'][envs, slots] = angles
+        pool['size'][envs, slots] = self.torpedo_sizes[self.rotation_cache.buckets_of(np.degrees(angles))]
+        pool['alive'][envs, slots] = True
+
+    def spawn_drones(self, envs):
+        # DroneBase.random_init, appended after the live drones so slot order stays spawn order
+        drones = self.drones
+        count = drones['alive'][envs].sum(axis=1)
+        fits = count < drones['alive'].shape[1]
+        self.dropped += int((~fits).sum())
+        envs, slots = envs[fits], count[fits]
+        n = len(envs)
+        side = self.rng.random(n) < 0.5
+        far = self.rng.integers(0, 2, n)
+        along = self.rng.integers(0, np.where(side, self.screen_shape[1], self.screen_shape[0]).astype('int64'))
+        drift = self.rng.choice([-DroneBase.drift, DroneBase.drift], n)
+        drones['pos'][envs, slots], drones['velocity'][envs, slots] = DroneBase.entry(side, far, along, drift, Drone.speed, self.screen_shape)
+        drones['alive'][envs, slots] = True
+        drones['init_time'][envs, slots] = self.now[envs]
+        drones['last_fired'][envs, slots] = self.now[envs]
+        drones['death_time'][envs, slots] = np.nan
+
+    def compact_drones(self):
+        # keep live drones at the front in spawn order, as sprite group iteration would see them
+        alive = self.drones['alive']
+        if not (alive[:, 1:] & ~alive[:, :-1]).any():
+            return
+        order = np.argsort(~alive, axis=1, kind='stable')
+        for name, array in self.drones.items():
+            self.drones[name] = np.take_along_axis(array, order if array.ndim == 2 else order[..., np.newaxis], axis=1)
+
+    def run_scheduler(self):
+        # the drone spawn timer and the 3 s ramp (increase_drone_spawn), earliest due first as in Scheduler
+        ramp_interval = main.RelativityWars.INCREASEDRONESPAWN_FREQ / 1000
+        while True:
+            spawning = (self.dronespawn_freq > 0) & (self.drone_due <= self.now)
+            ramping = self.increase_due <= self.now
+            ramp_first = ramping & (~spawning | (self.increase_due < self.drone_due))
+            spawn = spawning & ~ramp_first
+            if not (spawn.any() or ramp_first.any()):
+                return
+            envs = np.flatnonzero(spawn)
+            self.drone_due[envs] += self.dronespawn_freq[envs] / 1000
+            self.spawn_drones(envs)
+            envs = np.flatnonzero(ramp_first)
+            self.increase_due[envs] += ramp_interval
+            self.dronespawn_freq[envs] = self.params.ramped_dronespawn_freq(self.dronespawn_freq[envs])
+            self.drone_due[envs] = self.now[envs] + self.dronespawn_freq[envs] / 1000
+            self.holes['size'][envs] = BlackHole.enlarged(self.holes['size'][envs])
+
+    @staticmethod
+    def touches(pool, envs, slots, topleft, size):
+        # Projectiles.hits for the torpedoes at (envs, slots) against targets broadcast to them
+        return Projectiles.touches(pool['pos'][envs, slots], pool['prev_pos'][envs, slots], pool['size'][envs, slots], topleft, size)
+
+    def step(self, action):
+        action = np.asarray(action, dtype='float64').reshape(self.num_envs, 4)
+        move, boost, fire, aim = action[:, 0].astype('int64'), action[:, 1] > 0, action[:, 2] > 0, action[:, 3]
+        K = np.arange(self.num_envs)
+        fighter, drones, holes = self.fighter, self.drones, self.holes
+        self.now += self.dt
+        self.steps += 1
+        score_before, lives_before = self.score.copy(), self.lives.copy()
+
+        # events: Fighter.boost, Fighter.fire
+        boosting = boost & (self.now - fighter['boost_last_used'] > Fighter.boost_cooldown)
+        fighter['boost_active'] |= boosting
+        fighter['boost_last_used'][boosting] = self.now[boosting]
+        firing = np.flatnonzero(fire & np.isnan(fighter['death_time']))
+        self.launch(self.torpedoes, firing, fighter['pos'][firing], aim[firing], Torpedo.speed)
+
+        self.run_scheduler()
+
+        # enemy torpedoes against the fighter
+        fighter_topleft = RWSprite.centred_topleft(fighter['pos'], self.fighter_size)
+        pool = self.enemy_torpedoes
+        envs, slots = np.nonzero(pool['alive'] & ~fighter['reset_active'][:, np.newaxis])
+        hits = self.touches(pool, envs, slots, fighter_topleft[envs], self.fighter_size)
+        pool['alive'][envs[hits], slots[hits]] = False
+        hit = np.bincount(envs[hits], minlength=self.num_envs) > 0
+        self.lives -= hit
+        dying = hit & (self.lives >= 0) & np.isnan(fighter['death_time'])
+        fighter['death_time'][dying] = self.now[dying]
+
+        # fighter torpedoes against drones, in spawn order
+        pool = self.torpedoes
+        drone_topleft = RWSprite.centred_topleft(drones['pos'], self.drone_size)
+        for slot in range(drones['alive'].shape[1]):
+            present = drones['alive'][:, slot]
+            if not present.any():
+                break
+            envs, slots = np.nonzero(pool['alive'] & present[:, np.newaxis])
+            hits = self.touches(pool, envs, slots, drone_topleft[envs, slot], self.drone_size)
+            pool['alive'][envs[hits], slots[hits]] = False
+            killed = (np.bincount(envs[hits], minlength=self.num_envs) > 0) & np.isnan(drones['death_time'][:, slot])
+            self.score += killed
+            drones['death_time'][killed, slot] = self.now[killed]
+
+        # Fighter.update
+        respawning = fighter['death_time'] + Fighter.death_duration < self.now
+        if respawning.any():
+            self.reset_fighters(np.flatnonzero(respawning))
+        thrusting = (move > 0) & np.isnan(fighter['death_time'])
+        steering = thrusting & ~respawning  # the reset frame keeps facing right, as in Fighter.update
+        fighter['direction'][steering] = move[steering] - 1
+        fighter['boost_active'] &= ~(self.now - fighter['boost_last_used'] > Fighter.boost_duration)
+        fighter['reset_active'] &= ~(self.now - fighter['reset_time'] > Fighter.reset_duration)
+        accel = np.where(fighter['boost_active'], Fighter.boost_acceleration, Fighter.acceleration)
+        fighter_gravity = GravityEngine.field(fighter['pos'][:, np.newaxis], holes['pos'])[:, 0]  # before the holes move
+        fighter['velocity'] = Fighter.thrusted(fighter['velocity'], fighter_gravity, self.direction_vectors[fighter['direction']], accel * thrusting)
+        fighter['pos'], fighter['velocity'] = RWSprite.limited_to_screen(fighter['pos'], fighter['velocity'], self.screen_shape)
+
+        # black holes: BlackHole.update
+        arc_done = BlackHole.arc_done(holes['traversed'], holes['arc'])
+        if arc_done.any():
+            self.new_arcs(*np.nonzero(arc_done))
+        holes['direction'], holes['traversed'] = BlackHole.turned(holes['direction'], holes['radius'], holes['arc'], holes['traversed'])
+        holes['pos'] = RWSprite.wrapped(holes['pos'] + BlackHole.velocities(holes['direction']), self.screen_shape)
+        hole_topleft = RWSprite.centred_topleft(holes['pos'], holes['rect_size'][..., np.newaxis])
+        hole_size = np.repeat(holes['rect_size'][..., np.newaxis], 2, axis=-1)
+
+        # gravity for everything GravityEngine.apply covers
+        drone_gravity = GravityEngine.field(drones['pos'], holes['pos'])
+
+        # Projectiles.update for both pools on the live slots, then SpatialHash.black_hole_collisions on them
+        for pool in (self.torpedoes, self.enemy_torpedoes):
+            envs, slots = np.nonzero(pool['alive'])
+            pos = pool['pos'][envs, slots]
+            velocity = pool['velocity'][envs, slots] + GravityEngine.field(pos[:, np.newaxis], holes['pos'][envs])[:, 0]
+            pool['prev_pos'][envs, slots] = pos
+            pool['pos'][envs, slots], pool['velocity'][envs, slots] = pos + velocity, velocity
+            pool['angle'][envs, slots] = RWSprite.get_angles_from_vectors(velocity)
+            onscreen = RWSprite.on_screen(pos + velocity, self.screen_shape)
+            inside = self.touches(pool, envs[:, np.newaxis], slots[:, np.newaxis], hole_topleft[envs], hole_size[envs])
+            pool['alive'][envs, slots] = onscreen & ~inside.any(axis=-1)
+
+        # Drone.update: DroneBase.update (move, kill_if_offscreen, kill_if_in_black_hole), then the lifecycle
+        alive = drones['alive']
+        pos, drones['velocity'] = DroneBase.drifted(drones['pos'], drones['velocity'], drone_gravity, Drone.drag)
+        drones['pos'] = np.where(alive[..., np.newaxis], pos, drones['pos'])
+        onscreen = RWSprite.on_screen(drones['pos'], self.screen_shape)
+        inside = RWSprite.rects_collide(RWSprite.centred_topleft(drones['pos'], self.drone_size)[:, :, np.newaxis], self.drone_size,
+                                        hole_topleft[:, np.newaxis], hole_size[:, np.newaxis]).any(axis=-1)
+        expired, volley, gone = Drone.lifecycle(self.now[:, np.newaxis], drones['init_time'], drones['last_fired'], drones['death_time'])
+        drones['alive'] &= onscreen & ~inside & ~expired & ~gone
+        # a drone killed by the screen edge or a black hole this tick still fires on its way out, as in Drone.update
+        envs, slots = np.nonzero(alive & volley)
+        drones['last_fired'][envs, slots] = self.now[envs]
+        volley = len(Drone.volley_angles)
+        self.launch(self.enemy_torpedoes, np.repeat(envs, volley), np.repeat(drones['pos'][envs, slots], volley, axis=0),
+                    np.tile(Drone.volley_angles, len(envs)), Drone.torpedo_speed)
+        self.compact_drones()
+
+        reward = (self.score - score_before) - self.life_penalty * (lives_before - self.lives)
+        game_over = self.lives < 0
+        done = game_over | (self.steps >= self.max_steps)
+        info = {'game_over': game_over, 'score': self.score.copy(), 'steps': self.steps.copy()}
+        if done.any():
+            self.reset(done)
+        return self.observe(), reward.astype('float32'), done, info
+
+    def nearest(self, pos, present, origin, count):
+        # (K, count) indices of the closest present rows of pos (K, N, 2) to origin (K, 2), and whether each exists
+        offsets = pos - origin[:, np.newaxis]
+        distance = np.where(present, offsets[..., 0]**2 + offsets[..., 1]**2, np.inf)
+        if distance.shape[1] < count:
+            distance = np.pad(distance, ((0, 0), (0, count - distance.shape[1])), constant_values=np.inf)
+        candidates = np.argpartition(distance, count - 1, axis=1)[:, :count]  # the closest count, unordered
+        order = np.take_along_axis(candidates, np.argsort(np.take_along_axis(distance, candidates, axis=1), axis=1), axis=1)
+        return np.minimum(order, pos.shape[1] - 1), np.isfinite(np.take_along_axis(distance, order, axis=1))
+
+    def observe(self):
+        fighter, scale = self.fighter, self.screen_shape
+        origin = fighter['pos']
+        parts = [origin / scale, fighter['velocity'] / 20, np.isnan(fighter['death_time'])[:, np.newaxis],
+                 fighter['reset_active'][:, np.newaxis], (self.lives / self.params.lives)[:, np.newaxis]]
+        holes = self.holes
+        index, found = self.nearest(holes['pos'], np.ones(holes['size'].shape, dtype=bool), origin, self.obs_black_holes)
+        relative = np.take_along_axis(holes['pos'], index[..., np.newaxis], axis=1) - origin[:, np.newaxis]
+        size = np.take_along_axis(holes['rect_size'], index, axis=1)
+        parts += [(relative / scale * found[..., np.newaxis]).reshape(self.num_envs, -1), size / 200 * found, found]
+        for pool, count, extra in ((self.drones, self.obs_drones, 'death_time'), (self.enemy_torpedoes, self.obs_torpedoes, None)):
+            index, found = self.nearest(pool['pos'], pool['alive'], origin, count)
+            relative = np.take_along_axis(pool['pos'], index[..., np.newaxis], axis=1) - origin[:, np.newaxis]
+            velocity = np.take_along_axis(pool['velocity'], index[..., np.newaxis], axis=1)
+            parts += [(relative / scale * found[..., np.newaxis]).reshape(self.num_envs, -1),
+                      (velocity / 20 * found[..., np.newaxis]).reshape(self.num_envs, -1)]
+            if extra:  # live (not dying) drones
+                found = found & np.isnan(np.take_along_axis(pool[extra], index, axis=1))
+            parts.append(found)
+        return np.concatenate([np.asarray(part, dtype='float32').reshape(self.num_envs, -1) for part in parts], axis=1)
+
+    def render(self, index=0, surface=None):
+        # game `index` drawn with the sprite images, for inspection
+        if surface is None:
+            surface = pygame.Surface(tuple(int(d) for d in self.screen_shape))
+        surface.fill((0, 0, 0))
+        scale_cache = main.RelativityWars.scale_cache
+        holes = self.holes
+        for pos, size in zip(holes['pos'][index], holes['size'][index]):
+            image = scale_cache.scale(BlackHole.raw_image, (int(size), int(size)))
+            surface.blit(image, image.get_rect(center=tuple(int(p) for p in pos)))
+        drones = self.drones
+        for slot in np.flatnonzero(drones['alive'][index]):
+            dying = not np.isnan(drones['death_time'][index, slot])
+            image = self.rotation_cache.rotate(Drone.image_death, 0) if dying else Drone.image
+            surface.blit(image, image.get_rect(center=tuple(int(p) for p in drones['pos'][index, slot])))
+        for pool in (self.torpedoes, self.enemy_torpedoes):
+            for slot in np.flatnonzero(pool['alive'][index]):
+                image = self.rotation_cache.rotate(Torpedo.raw_image, math.degrees(pool['angle'][index, slot]))
+                surface.blit(image, image.get_rect(center=tuple(int(p) for p in pool['pos'][index, slot])))
+        fighter = self.fighter
+        dead = not np.isnan(fighter['death_time'][index])
+        image = Fighter.death_image if dead else Fighter.directions[self.directions[fighter['direction'][index]]]['image']
+        surface.blit(image, image.get_rect(center=tuple(int(p) for p in fighter['pos'][index])))
+        return surface